@@ -1,2 +1,10 @@
 from .agent import Agent
-from .events import AgentEvent, AgentEventType
+from .events import (
+    AgentEvent,
+    AgentEventType,
+    AgentStartEvent,
+    AgentEndEvent,
+    AgentErrorEvent,
+    TextDeltaEvent,
+    TextCompleteEvent,
+)
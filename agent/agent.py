@@ -1,52 +1,176 @@
 from __future__ import annotations
-from agent.events import AgentEventType, AgentEvent
-from client import StreamEventType, LLMClient
-from typing import AsyncGenerator
-from context import ContextManager
+from agent.events import AgentEventType, AgentEvent, TextDeltaEvent
+from client.response import StreamEventType, TokenUsage
+from client.stream import RunLimits, StreamControl
+from contextlib import aclosing
+from typing import TYPE_CHECKING, AsyncGenerator
+from config import config
+from context import ContextCompactor, ContextManager, Session
+from metrics import Span, get_tracer
+import asyncio
+import time
+
+if TYPE_CHECKING:
+    from client.llm_client import LLMClient
 
 
 class Agent:
-    def __init__(self):
-        self.client = LLMClient()
-        self._context_manager = ContextManager()
+    def __init__(
+        self,
+        session: Session | None = None,
+        limits: RunLimits | None = None,
+        client: LLMClient | None = None,
+    ):
+        # A client passed in is shared (e.g. by every session of a server) and left open on close
+        self._owns_client = client is None
+        if client is None:
+            # Imported here so `import agent` stays cheap; openai loads with the first client
+            from client.llm_client import LLMClient
+
+            client = LLMClient()
+
+        self.client = client
+        compactor = ContextCompactor(self.client) if config.COMPACTION_ENABLED else None
+        self._context_manager = ContextManager(session, compactor)
+        self._session_id = session.id if session is not None else None
+        # Usage summed over every request this agent has made
+        self.usage = TokenUsage()
+        self._run_usage: TokenUsage | None = None
+        self._finish_reason: str | None = None
+        # Default limits for each run
+        self.limits = limits
+        self._control: StreamControl | None = None
+
+    @property
+    def context_manager(self) -> ContextManager:
+        return self._context_manager
 
-    async def run(self, message: str):
+    async def run(
+        self,
+        message: str,
+        stream: bool = True,
+        limits: RunLimits | None = None,
+    ):
+        """Run one turn. With stream=False the reply arrives whole, with no text deltas.
+
+        Closing the generator early, or calling cancel(), closes the request
+        in flight so the provider stops generating.
+        """
+        started_at = time.time()
+        start = time.perf_counter()
+        self._run_usage = None
+        self._finish_reason = None
+        errors = 0
+        control = self._control = StreamControl(limits or self.limits)
         yield AgentEvent.agent_start(message)
 
         self._context_manager.add_user_message(message)
 
         final_response: str | None = None
-        
-        async for event in self._agentic_loop():
-            yield event
-
-            if event.type == AgentEventType.TEXT_COMPLETE:
-                final_response = event.data.get("content")
-        
-        yield AgentEvent.agent_end(final_response)
-
-    async def _agentic_loop(self) -> AsyncGenerator[AgentEvent, None]:
-        response_text = ""
-        
-        async for event in self.client.chat_completion(self._context_manager.get_messages(), True):
-            if event.type == StreamEventType.TEXT_DELTA:
-                if event.text_delta:
-                    content = event.text_delta.content
-                    response_text += content
-                    yield AgentEvent.text_delta(content)
-            elif event.type == StreamEventType.ERROR:
-                yield AgentEvent.agent_error(event.error or "Unknown error occured")
-                
-        self._context_manager.add_assistant_message(
-            response_text or None,
-        )   
+        ended = False
+
+        try:
+            async with aclosing(self._agentic_loop(stream, control)) as events:
+                async for event in events:
+                    yield event
+
+                    if event.type == AgentEventType.TEXT_COMPLETE:
+                        final_response = event.content
+                    elif event.type == AgentEventType.AGENT_ERROR:
+                        errors += 1
+
+            self._control = None
+            ended = True
+            yield AgentEvent.agent_end(final_response, self._run_usage, self._finish_reason)
+        finally:
+            self._control = None
+            # Here rather than after agent_end: consumers often close the run on that event
+            usage = self._run_usage
+            attributes = {
+                "model": config.DEFAULT_AI_MODEL or "unknown",
+                "status": "error" if errors else "ok" if ended else "cancelled",
+                "duration_seconds": time.perf_counter() - start,
+            }
+            if self._session_id:
+                attributes["session_id"] = self._session_id
+            if usage is not None:
+                attributes["prompt_tokens"] = usage.prompt_tokens
+                attributes["completion_tokens"] = usage.completion_tokens
+                attributes["cached_tokens"] = usage.cached_tokens
+            get_tracer().emit(
+                Span("agent.run", started_at, time.perf_counter() - start, attributes)
+            )
+
+    def cancel(self) -> None:
+        """Stop the run in progress; it ends with finish_reason "cancelled"."""
+        if self._control is not None:
+            self._control.cancel()
+
+    async def _agentic_loop(
+        self,
+        stream: bool = True,
+        control: StreamControl | None = None,
+    ) -> AsyncGenerator[AgentEvent, None]:
+        response_parts: list[str] = []
+        completion = self.client.chat_completion(
+            self._context_manager.get_messages(),
+            stream,
+            self._session_id,
+            prompt_tokens=self._context_manager.window_tokens(),
+            control=control,
+        )
+
+        try:
+            async with aclosing(completion) as events:
+                async for event in events:
+                    if event.type == StreamEventType.TEXT_DELTA:
+                        content = event.text_delta.content
+                        if content:
+                            response_parts.append(content)
+                            yield TextDeltaEvent(content)
+                    elif event.type == StreamEventType.MESSAGE_COMPLETE:
+                        if event.text_delta and event.text_delta.content:
+                            # Non-streaming replies carry the whole text here
+                            response_parts.append(event.text_delta.content)
+                        self._finish_reason = event.finish_reason
+                        if event.usage is not None:
+                            self.usage = self.usage + event.usage
+                            self._run_usage = (
+                                event.usage if self._run_usage is None else self._run_usage + event.usage
+                            )
+                    elif event.type == StreamEventType.ERROR:
+                        yield AgentEvent.agent_error(event.error or "Unknown error occured")
+        finally:
+            # Also runs when the turn is cancelled mid-stream: keep what was shown
+            # so the history still alternates user/assistant
+            response_text = "".join(response_parts)
+            self._context_manager.add_assistant_message(
+                response_text or None,
+            )   
         if response_text:
             yield AgentEvent.text_complete(response_text)
 
+    async def warm_up(self) -> None:
+        """Load the tokenizer and connect to the endpoint before the first turn."""
+        context_manager = self._context_manager
+        await asyncio.gather(
+            # Loads the encoding on the way; nothing has counted tokens yet
+            asyncio.to_thread(lambda: context_manager.system_tokens),
+            self.client.warm_up(),
+        )
+
     async def __aenter__(self) -> Agent:
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        if self._context_manager.compactor is not None:
+            await self._context_manager.compactor.cancel()
         if self.client:
-            await self.client.close()
-            self.client = None
\ No newline at end of file
+            if self._owns_client:
+                await self.client.close()
+            self.client = None
+        if self._context_manager.session is not None:
+            self._context_manager.session.close()
\ No newline at end of file
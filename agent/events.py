@@ -1,8 +1,8 @@
 from __future__ import annotations
 from client.response import TokenUsage
-from typing import Any
+from typing import Any, ClassVar
 from enum import Enum
-from dataclasses import dataclass, field
+from dataclasses import dataclass, asdict
 
 class AgentEventType(str, Enum):
     # Agent lifecyle
@@ -14,36 +14,36 @@ class AgentEventType(str, Enum):
     TEXT_DELTA = "text_delta"
     TEXT_COMPLETE = "text_complete"
 
-@dataclass
 class AgentEvent:
-    type: AgentEventType
-    data: dict[str, Any] = field(default_factory=dict)
+    """Base for the typed agent events.
+
+    Read fields as attributes (e.g. `event.content`); `data` builds the legacy
+    dict view on demand and is kept only for compatibility.
+    """
+
+    __slots__ = ()
+
+    type: ClassVar[AgentEventType]
+
+    @property
+    def data(self) -> dict[str, Any]:
+        return {}
 
     @classmethod
     def agent_start(
         cls,
         message: str
     ) -> AgentEvent:
-        return cls(
-            type=AgentEventType.AGENT_START,
-            data={
-                "message": message,
-            },
-        )
+        return AgentStartEvent(message)
 
     @classmethod
     def agent_end(
         cls,
         response: str | None = None,
-        usage: TokenUsage | None = None
+        usage: TokenUsage | None = None,
+        finish_reason: str | None = None,
     ) -> AgentEvent:
-        return cls(
-            type=AgentEventType.AGENT_END,
-            data={
-                "response": response, 
-                "usage": usage.__dict__ if usage else None
-            },
-        )
+        return AgentEndEvent(response, usage, finish_reason)
 
     @classmethod
     def agent_error(
@@ -51,36 +51,70 @@ class AgentEvent:
         error: str,
         details: dict[str, Any] | None = None
     ) -> AgentEvent:
-        return cls(
-            type=AgentEventType.AGENT_ERROR,
-            data={
-                "error": error,
-                "details": details or {},
-            },
-        )
-    
+        return AgentErrorEvent(error, details or {})
+
     @classmethod
     def text_delta(
         cls,
         content: str,
     ) -> AgentEvent:
-        return cls(
-            type=AgentEventType.TEXT_DELTA,
-            data={
-                "content": content,
-            },
-        )
+        return TextDeltaEvent(content)
 
     @classmethod
     def text_complete(
         cls,
         content: str,
     ) -> AgentEvent:
-        return cls(
-            type=AgentEventType.TEXT_COMPLETE,
-            data={
-                "content": content,
-            }
-        )
-
-    
\ No newline at end of file
+        return TextCompleteEvent(content)
+
+@dataclass(slots=True)
+class AgentStartEvent(AgentEvent):
+    type: ClassVar[AgentEventType] = AgentEventType.AGENT_START
+    message: str
+
+    @property
+    def data(self) -> dict[str, Any]:
+        return {"message": self.message}
+
+@dataclass(slots=True)
+class AgentEndEvent(AgentEvent):
+    type: ClassVar[AgentEventType] = AgentEventType.AGENT_END
+    response: str | None = None
+    usage: TokenUsage | None = None
+    finish_reason: str | None = None
+
+    @property
+    def data(self) -> dict[str, Any]:
+        return {
+            "response": self.response,
+            "usage": asdict(self.usage) if self.usage else None,
+            "finish_reason": self.finish_reason,
+        }
+
+@dataclass(slots=True)
+class AgentErrorEvent(AgentEvent):
+    type: ClassVar[AgentEventType] = AgentEventType.AGENT_ERROR
+    error: str
+    details: dict[str, Any]
+
+    @property
+    def data(self) -> dict[str, Any]:
+        return {"error": self.error, "details": self.details}
+
+@dataclass(slots=True)
+class TextDeltaEvent(AgentEvent):
+    type: ClassVar[AgentEventType] = AgentEventType.TEXT_DELTA
+    content: str
+
+    @property
+    def data(self) -> dict[str, Any]:
+        return {"content": self.content}
+
+@dataclass(slots=True)
+class TextCompleteEvent(AgentEvent):
+    type: ClassVar[AgentEventType] = AgentEventType.TEXT_COMPLETE
+    content: str
+
+    @property
+    def data(self) -> dict[str, Any]:
+        return {"content": self.content}
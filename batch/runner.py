@@ -0,0 +1,173 @@
+from __future__ import annotations
+import asyncio
+import json
+import statistics
+import time
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Any, Iterator
+from agent import Agent, AgentEventType
+
+PROMPT_KEYS = ("prompt", "message", "body")
+ID_KEYS = ("id", "request_id")
+
+
+@dataclass
+class BatchItem:
+    id: str
+    prompt: str
+
+
+@dataclass
+class BatchResult:
+    id: str
+    response: str | None = None
+    error: str | None = None
+    latency: float = 0.0
+    ttft: float | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.response is not None
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class BatchSummary:
+    total: int = 0
+    skipped: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    duration: float = 0.0
+    latencies: list[float] = field(default_factory=list)
+    ttfts: list[float] = field(default_factory=list)
+
+    @property
+    def completed(self) -> int:
+        return self.succeeded + self.failed
+
+    @property
+    def throughput(self) -> float:
+        return self.completed / self.duration if self.duration else 0.0
+
+    def percentile(self, values: list[float], pct: float) -> float | None:
+        if not values:
+            return None
+        if len(values) == 1:
+            return values[0]
+        return statistics.quantiles(values, n=100, method="inclusive")[int(pct) - 1]
+
+
+def read_items(path: Path) -> Iterator[BatchItem]:
+    with path.open(encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+
+            record = json.loads(line)
+            prompt = next((record[key] for key in PROMPT_KEYS if record.get(key)), None)
+            if prompt is None:
+                raise ValueError(f"{path}:{line_number}: no prompt field ({', '.join(PROMPT_KEYS)})")
+
+            item_id = next((str(record[key]) for key in ID_KEYS if record.get(key)), None)
+            yield BatchItem(id=item_id or f"line-{line_number}", prompt=prompt)
+
+
+def read_completed_ids(path: Path) -> set[str]:
+    completed: set[str] = set()
+    if not path.exists():
+        return completed
+
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A run killed mid-write can leave a truncated last line
+                continue
+            if record.get("error") is None and record.get("response") is not None:
+                completed.add(record["id"])
+
+    return completed
+
+
+class BatchRunner:
+    def __init__(
+        self,
+        input_path: Path,
+        output_path: Path,
+        concurrency: int = 8,
+    ) -> None:
+        self.input_path = input_path
+        self.output_path = output_path
+        self.concurrency = max(1, concurrency)
+        self.summary = BatchSummary()
+
+    async def run(self) -> BatchSummary:
+        completed = read_completed_ids(self.output_path)
+        queue: asyncio.Queue[BatchItem | None] = asyncio.Queue(maxsize=self.concurrency * 2)
+        start = time.perf_counter()
+
+        with self.output_path.open("a", encoding="utf-8") as out:
+            workers = [
+                asyncio.create_task(self._worker(queue, out))
+                for _ in range(self.concurrency)
+            ]
+
+            try:
+                for item in read_items(self.input_path):
+                    self.summary.total += 1
+                    if item.id in completed:
+                        self.summary.skipped += 1
+                        continue
+                    await queue.put(item)
+            finally:
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+
+        self.summary.duration = time.perf_counter() - start
+        return self.summary
+
+    async def _worker(self, queue: asyncio.Queue[BatchItem | None], out) -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+
+            result = await self._run_item(item)
+            out.write(json.dumps(result.to_dict(), ensure_ascii=False) + "\n")
+            out.flush()
+
+            if result.ok:
+                self.summary.succeeded += 1
+                self.summary.latencies.append(result.latency)
+                if result.ttft is not None:
+                    self.summary.ttfts.append(result.ttft)
+            else:
+                self.summary.failed += 1
+
+    async def _run_item(self, item: BatchItem) -> BatchResult:
+        result = BatchResult(id=item.id)
+        start = time.perf_counter()
+
+        try:
+            async with Agent() as agent:
+                async for event in agent.run(item.prompt):
+                    if event.type == AgentEventType.TEXT_DELTA and result.ttft is None:
+                        result.ttft = time.perf_counter() - start
+                    elif event.type == AgentEventType.AGENT_ERROR:
+                        result.error = event.error or "Unknown error"
+                    elif event.type == AgentEventType.AGENT_END:
+                        result.response = event.response
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}"
+
+        if result.response is None and result.error is None:
+            result.error = "Empty response"
+
+        result.latency = time.perf_counter() - start
+        return result
@@ -0,0 +1,152 @@
+"""End-to-end Agent.run latency against the local mock server.
+
+Reports time-to-first-token, inter-delta latency percentiles, events/sec and
+client-side CPU per request at several concurrency levels. The mock server
+runs in a subprocess so its CPU isn't charged to the agent.
+
+Run from the repo root:
+    python -m benchmarks.bench_agent_e2e [--levels 1,10,100] [--requests 200]
+        [--server-args "--tokens 256 --tokens-per-second 2000"]
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import shlex
+import socket
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from config import config
+
+
+@dataclass
+class SessionStats:
+    ttft: float | None = None
+    gaps: list[float] = field(default_factory=list)
+    events: int = 0
+    error: str | None = None
+
+
+def _percentiles(values: list[float]) -> str:
+    if not values:
+        return "      -         -         -"
+    values = sorted(values)
+
+    def at(pct: float) -> float:
+        return values[min(len(values) - 1, int(len(values) * pct))] * 1000
+
+    return f"{at(0.50):8.2f}  {at(0.95):8.2f}  {at(0.99):8.2f}"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(port: int, extra_args: str) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.mock_server", "--port", str(port), *shlex.split(extra_args)],
+        stdout=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("mock server did not start")
+
+
+async def _session(prompt: str) -> SessionStats:
+    from agent import Agent, AgentEventType
+
+    stats = SessionStats()
+    start = time.perf_counter()
+    last: float | None = None
+
+    async with Agent() as agent:
+        async for event in agent.run(prompt):
+            stats.events += 1
+            if event.type == AgentEventType.TEXT_DELTA:
+                now = time.perf_counter()
+                if last is None:
+                    stats.ttft = now - start
+                else:
+                    stats.gaps.append(now - last)
+                last = now
+            elif event.type == AgentEventType.AGENT_ERROR:
+                stats.error = event.error
+
+    return stats
+
+
+async def _run_level(concurrency: int, requests: int) -> None:
+    from client import get_client_pool
+
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for index in range(requests):
+        queue.put_nowait(index)
+    results: list[SessionStats] = []
+
+    async def worker() -> None:
+        while not queue.empty():
+            index = queue.get_nowait()
+            results.append(await _session(f"benchmark prompt {index}"))
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    await get_client_pool().aclose()
+
+    ttfts = [stats.ttft for stats in results if stats.ttft is not None]
+    gaps = [gap for stats in results for gap in stats.gaps]
+    events = sum(stats.events for stats in results)
+    errors = sum(1 for stats in results if stats.error)
+
+    print(
+        f"{concurrency:>5}  {len(results):>5}  {errors:>4}  {_percentiles(ttfts)}  "
+        f"{_percentiles(gaps)}  {events / wall:10.0f}  {cpu / len(results) * 1000:8.2f}"
+    )
+
+
+async def _main(args: argparse.Namespace) -> None:
+    print(
+        "  conc   reqs  errs  ttft p50/p95/p99 (ms)       "
+        "delta gap p50/p95/p99 (ms)  events/s  cpu ms/req"
+    )
+    for level in args.levels:
+        await _run_level(level, max(args.requests, level))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--levels",
+        type=lambda value: [int(level) for level in value.split(",")],
+        default=[1, 10, 100],
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--server-args", default="--tokens 128 --chunk-size 1")
+    args = parser.parse_args()
+
+    port = _free_port()
+    server = _start_server(port, args.server_args)
+    try:
+        config.BASE_URL = f"http://127.0.0.1:{port}/v1"
+        config.OPENROUTER_API_KEY = "mock"
+        config.DEFAULT_AI_MODEL = "mock-model"
+        config.RESPONSE_CACHE_PATH = None
+        asyncio.run(_main(args))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
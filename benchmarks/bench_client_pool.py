@@ -0,0 +1,89 @@
+"""Time-to-first-token for cold (client per run) vs warm (pooled) connections.
+
+Runs against the local mock server, so the difference is connection setup
+only (TCP here; TLS handshakes against a real provider widen the gap).
+
+Run from the repo root: python -m benchmarks.bench_client_pool [--runs N] [--concurrency C]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from benchmarks.mock_server import MockServer, MockSettings
+from client import ClientPool, LLMClient, PoolSettings, StreamEventType
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+async def _ttft(client: LLMClient) -> float:
+    start = time.perf_counter()
+    first: float | None = None
+    async for event in client.chat_completion(MESSAGES):
+        if first is None and event.type == StreamEventType.TEXT_DELTA:
+            first = time.perf_counter() - start
+    return first or 0.0
+
+
+async def _cold_run(base_url: str) -> float:
+    pool = ClientPool(PoolSettings(keepalive_expiry=0))
+    client = LLMClient(base_url=base_url, api_key="mock", pool=pool)
+    try:
+        return await _ttft(client)
+    finally:
+        await client.close()
+
+
+async def _warm_run(base_url: str, pool: ClientPool) -> float:
+    client = LLMClient(base_url=base_url, api_key="mock", pool=pool)
+    try:
+        return await _ttft(client)
+    finally:
+        await client.close()
+
+
+def _report(label: str, samples: list[float], connections: int) -> None:
+    samples = sorted(samples)
+    p50 = statistics.median(samples) * 1000
+    p95 = samples[int(len(samples) * 0.95) - 1] * 1000
+    print(f"{label:<22} p50 {p50:7.2f} ms  p95 {p95:7.2f} ms  connections {connections}")
+
+
+async def _main(args: argparse.Namespace) -> None:
+    async with MockServer(MockSettings(tokens=8)) as server:
+        base_url = server.base_url
+
+        cold = [await _cold_run(base_url) for _ in range(args.runs)]
+        _report("cold, sequential", cold, server.connections)
+
+        pool = ClientPool()
+        await _warm_run(base_url, pool)
+        server.connections = 0
+        warm = [await _warm_run(base_url, pool) for _ in range(args.runs)]
+        _report("warm, sequential", warm, server.connections)
+
+        server.connections = 0
+        cold_concurrent = await asyncio.gather(
+            *(_cold_run(base_url) for _ in range(args.concurrency))
+        )
+        _report(f"cold, {args.concurrency} concurrent", cold_concurrent, server.connections)
+
+        server.connections = 0
+        warm_concurrent = []
+        for _ in range(args.runs // args.concurrency or 1):
+            warm_concurrent += await asyncio.gather(
+                *(_warm_run(base_url, pool) for _ in range(args.concurrency))
+            )
+        _report(f"warm, {args.concurrency} concurrent", warm_concurrent, server.connections)
+
+        await pool.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
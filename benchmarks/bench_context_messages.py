@@ -0,0 +1,59 @@
+"""Cost of ContextManager.get_messages on a long history, rebuilt vs cached.
+
+Run from the repo root: python -m benchmarks.bench_context_messages [--messages N]
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from context.manager import ContextManager, MessageItem
+
+
+def _legacy_get_messages(manager: ContextManager) -> list[dict]:
+    messages = [{"role": "system", "content": manager._system_prompt}]
+    for item in manager._messages:
+        messages.append(item.to_dict())
+    return messages
+
+
+def _time_per_turn(fn, manager: ContextManager, turns: int) -> float:
+    fn(manager)
+    start = time.perf_counter()
+    for turn in range(turns):
+        manager.add_user_message(f"follow-up question {turn}")
+        fn(manager)
+    return (time.perf_counter() - start) / turns
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--turns", type=int, default=200)
+    args = parser.parse_args()
+
+    def build() -> ContextManager:
+        manager = ContextManager()
+        manager._max_input_tokens = sys.maxsize
+        for index in range(args.messages):
+            if index % 2:
+                manager.add_assistant_message(f"assistant reply number {index}")
+            else:
+                manager.add_user_message(f"user message number {index}")
+        return manager
+
+    legacy = _time_per_turn(_legacy_get_messages, build(), args.turns)
+    cached = _time_per_turn(lambda manager: manager.get_messages(), build(), args.turns)
+
+    print(f"history: {args.messages} messages, {args.turns} turns")
+    print(f"legacy get_messages  {legacy * 1e6:10.1f} us/turn")
+    print(f"cached get_messages  {cached * 1e6:10.1f} us/turn  ({legacy / cached:.1f}x)")
+
+    tracemalloc.start()
+    items = [MessageItem(role="user", content="x", token_count=1) for _ in range(args.messages)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"MessageItem memory   {size / len(items):10.1f} B/item")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Events/sec through Agent._agentic_loop against a canned SSE stream.
+
+The HTTP layer is replaced by pre-encoded SSE lines, so this measures chunk
+parsing, StreamEvent/AgentEvent construction and the agent loop only.
+
+Run from the repo root: python -m benchmarks.bench_events [--deltas N] [--rounds R]
+"""
+import argparse
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+from agent import Agent
+
+
+def _sse_lines(deltas: int) -> list[str]:
+    def chunk(delta: dict, finish_reason=None) -> dict:
+        return {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "bench",
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+
+    lines = []
+    for _ in range(deltas):
+        lines += ["data: " + json.dumps(chunk({"content": "tok "})), ""]
+    lines += ["data: " + json.dumps(chunk({}, "stop")), ""]
+    usage = {
+        "prompt_tokens": 10,
+        "completion_tokens": deltas,
+        "total_tokens": 10 + deltas,
+        "prompt_tokens_details": {"cached_tokens": 0},
+    }
+    lines += ["data: " + json.dumps({**chunk({}), "choices": [], "usage": usage}), ""]
+    lines += ["data: [DONE]", ""]
+    return lines
+
+
+class _CannedResponse:
+    def __init__(self, lines: list[str]) -> None:
+        self._lines = lines
+        self.http_request = None
+
+    async def iter_lines(self):
+        for line in self._lines:
+            yield line
+
+    async def close(self) -> None:
+        return None
+
+
+def _canned_client(lines: list[str]) -> SimpleNamespace:
+    async def post(path, **kwargs):
+        return _CannedResponse(lines)
+
+    return SimpleNamespace(post=post)
+
+
+async def _run(deltas: int, rounds: int) -> None:
+    lines = _sse_lines(deltas)
+    agent = Agent()
+    agent.client.get_client = lambda: _canned_client(lines)
+
+    best = 0.0
+    for _ in range(rounds):
+        agent._context_manager.add_user_message("benchmark")
+        events = 0
+        start = time.perf_counter()
+        async for _event in agent._agentic_loop():
+            events += 1
+        elapsed = time.perf_counter() - start
+        best = max(best, events / elapsed)
+
+    print(f"{deltas} deltas x {rounds} rounds: best {best:,.0f} events/s ({1e6 / best:.2f} us/event)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--deltas", type=int, default=50_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(_run(args.deltas, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Load test for the WebSocket agent server (main.py --serve).
+
+Starts the mock LLM and the server as separate processes, then opens
+--sessions concurrent WebSocket sessions that each run --turns turns. The
+mock stamps every delta with its send time, so delta latency is measured
+from the mock writing it to the load client receiving it through the server.
+
+Reports delta latency percentiles, TTFT, the server's CPU time and peak RSS,
+and sessions/core: concurrent sessions divided by the CPU cores the server
+used while serving them.
+
+Run from the repo root:
+    python -m benchmarks.bench_server [--sessions 200] [--turns 3]
+        [--tokens 64] [--tokens-per-second 40] [--max-resident-tokens N]
+        [--pool-shards 8]
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from websockets.asyncio.client import connect
+
+
+async def _start(args: list[str], env: dict[str, str], ready: str) -> tuple[asyncio.subprocess.Process, str]:
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, *args,
+        env=env,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    line = (await asyncio.wait_for(process.stdout.readline(), 30)).decode()
+    if ready not in line:
+        process.kill()
+        raise RuntimeError(f"{' '.join(args)} did not start: {line!r}")
+    return process, line.split(ready, 1)[1].strip()
+
+
+def _cpu_seconds(pid: int) -> float | None:
+    try:
+        fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    # utime and stime are fields 14 and 15 of stat, 12 and 13 after the ")"
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def _peak_rss_mb(pid: int) -> float | None:
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+async def _session(url: str, turns: int, latencies: list[float], ttfts: list[float], errors: list[str]) -> None:
+    async with connect(url, compression=None, max_size=None) as websocket:
+        json.loads(await websocket.recv())
+        for turn in range(turns):
+            sent = time.time()
+            await websocket.send(json.dumps({"t": "message", "c": f"turn {turn}"}))
+            first = True
+            while True:
+                frame = json.loads(await websocket.recv())
+                kind = frame["t"]
+                if kind == "d":
+                    now = time.time()
+                    if first:
+                        ttfts.append(now - sent)
+                        first = False
+                    content = frame["c"]
+                    if content.startswith("@"):
+                        latencies.append(now - float(content[1:]))
+                elif kind in ("agent_error", "error"):
+                    errors.append(frame.get("e") or kind)
+                elif kind == "agent_end":
+                    break
+
+
+def _pct(values: list[float], pct: int) -> str:
+    if not values:
+        return "-"
+    if len(values) == 1:
+        return f"{values[0] * 1000:.1f}"
+    return f"{statistics.quantiles(values, n=100, method='inclusive')[pct - 1] * 1000:.1f}"
+
+
+async def _run(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        env = {**os.environ}
+        env.pop("RESPONSE_CACHE_PATH", None)
+
+        mock, base_url = await _start(
+            [
+                "-m", "benchmarks.mock_server", "--port", "0",
+                "--tokens", str(args.tokens),
+                "--tokens-per-second", str(args.tokens_per_second),
+                "--timestamp-tokens",
+            ],
+            env,
+            "listening on",
+        )
+        server_env = {
+            **env,
+            "BASE_URL": base_url,
+            "OPENROUTER_API_KEY": "mock",
+            "DEFAULT_AI_MODEL": "mock-model",
+            "SESSION_DIR": directory,
+            "COMPACTION_ENABLED": "0",
+            "HTTP_MAX_CONNECTIONS": str(max(100, args.sessions)),
+            "HTTP_MAX_KEEPALIVE_CONNECTIONS": str(max(20, args.sessions)),
+            "HTTP_POOL_SHARDS": str(args.pool_shards),
+        }
+        if args.max_resident_tokens:
+            server_env["SERVER_MAX_RESIDENT_TOKENS"] = str(args.max_resident_tokens)
+        server, url = await _start(["main.py", "--serve", "--port", "0"], server_env, "listening on")
+
+        try:
+            latencies: list[float] = []
+            ttfts: list[float] = []
+            errors: list[str] = []
+
+            cpu_before = _cpu_seconds(server.pid)
+            start = time.perf_counter()
+            await asyncio.gather(*[
+                _session(url, args.turns, latencies, ttfts, errors)
+                for _ in range(args.sessions)
+            ])
+            wall = time.perf_counter() - start
+            cpu_after = _cpu_seconds(server.pid)
+            rss = _peak_rss_mb(server.pid)
+        finally:
+            for process in (server, mock):
+                process.terminate()
+                await process.wait()
+
+    turns = args.sessions * args.turns
+    print(f"{args.sessions} sessions x {args.turns} turns x {args.tokens} deltas in {wall:.2f}s")
+    print(f"  errors            {len(errors)}")
+    print(f"  deltas            {len(latencies)}  ({len(latencies) / wall:,.0f}/s)")
+    print(f"  delta latency ms  p50 {_pct(latencies, 50)}  p99 {_pct(latencies, 99)}")
+    print(f"  ttft ms           p50 {_pct(ttfts, 50)}  p99 {_pct(ttfts, 99)}")
+    print(f"  turns/s           {turns / wall:,.1f}")
+    if cpu_before is not None and cpu_after is not None:
+        cores = (cpu_after - cpu_before) / wall
+        print(f"  server cpu        {cpu_after - cpu_before:.2f}s ({cores:.2f} cores)")
+        if cores:
+            print(f"  sessions/core     {args.sessions / cores:,.0f}")
+    if rss is not None:
+        print(f"  server peak rss   {rss:.0f} MB")
+    if errors:
+        print(f"  first error       {errors[0]}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--tokens", type=int, default=64)
+    parser.add_argument("--tokens-per-second", type=float, default=40)
+    parser.add_argument("--max-resident-tokens", type=int, default=None)
+    parser.add_argument("--pool-shards", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Time to resume a long saved session, windowed read vs full replay.
+
+The full replay baseline reads every line and re-tokenizes every message,
+which is what rebuilding a ContextManager from a transcript used to cost.
+
+Run from the repo root: python -m benchmarks.bench_session_resume [--messages N]
+"""
+import argparse
+import json
+import tempfile
+import time
+from context import ContextManager, SessionStore
+from context.manager import MessageItem
+from config import config
+from utils import count_tokens
+
+
+def _full_replay(path) -> int:
+    manager = ContextManager()
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record["role"] == "user":
+                manager.add_user_message(record["content"])
+            else:
+                manager.add_assistant_message(record["content"])
+    return len(manager.get_messages())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=50_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = SessionStore(directory)
+        session = store.create()
+        for index in range(args.messages):
+            role = "assistant" if index % 2 else "user"
+            content = f"{role} message number {index} " * 8
+            session.append(MessageItem(role, content, count_tokens(content, config.DEFAULT_AI_MODEL)))
+        session.close()
+
+        start = time.perf_counter()
+        replayed = _full_replay(session.path)
+        replay = time.perf_counter() - start
+
+        start = time.perf_counter()
+        manager = ContextManager(store.open(session.id))
+        windowed = len(manager.get_messages())
+        resume = time.perf_counter() - start
+
+        print(f"session: {args.messages} messages, {session.path.stat().st_size / 1e6:.1f} MB")
+        print(f"full replay   {replay * 1000:10.1f} ms  ({replayed} messages sent)")
+        print(f"resume        {resume * 1000:10.1f} ms  ({windowed} messages sent, {replay / resume:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
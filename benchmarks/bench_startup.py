@@ -0,0 +1,116 @@
+"""CLI cold-start benchmark with regression thresholds.
+
+Measures two things, each as the median of several fresh interpreters:
+  - `python -X importtime -c "import main"`: cumulative import time of main,
+    plus the slowest modules it pulls in
+  - wall time from spawning `python main.py <prompt>` until the mock server
+    receives its first request
+
+Exits non-zero if either median is over its threshold, so it can gate CI.
+
+Run from the repo root:
+    python -m benchmarks.bench_startup [--runs 5] [--max-import-ms 200]
+        [--max-first-request-ms 1000]
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.mock_server import MockServer, MockSettings
+
+
+def _import_profile() -> tuple[float, list[tuple[float, str]]]:
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+
+    total = 0.0
+    modules: list[tuple[float, str]] = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Top-level (unindented) entries only, so nested modules aren't double counted
+        if not name.startswith("  "):
+            modules.append((int(cumulative) / 1000, name.strip()))
+        if name.strip() == "main":
+            total = int(cumulative) / 1000
+
+    modules.sort(reverse=True)
+    return total, modules
+
+
+async def _time_to_first_request(server: MockServer, env: dict[str, str]) -> float:
+    seen = server.requests
+    start = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "main.py", "startup benchmark",
+        env=env,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        while server.requests == seen:
+            if process.returncode is not None:
+                raise RuntimeError("main.py exited before sending a request")
+            await asyncio.sleep(0.001)
+        return time.perf_counter() - start
+    finally:
+        await process.wait()
+
+
+async def _first_request_runs(runs: int) -> list[float]:
+    with tempfile.TemporaryDirectory() as directory:
+        async with MockServer(MockSettings(tokens=8)) as server:
+            env = {
+                **os.environ,
+                "BASE_URL": server.base_url,
+                "OPENROUTER_API_KEY": "mock",
+                "DEFAULT_AI_MODEL": "mock-model",
+                "SESSION_DIR": directory,
+            }
+            env.pop("RESPONSE_CACHE_PATH", None)
+            return [await _time_to_first_request(server, env) for _ in range(runs)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8)
+    parser.add_argument("--max-import-ms", type=float, default=200)
+    parser.add_argument("--max-first-request-ms", type=float, default=1000)
+    args = parser.parse_args()
+
+    profiles = [_import_profile() for _ in range(args.runs)]
+    import_ms = statistics.median(total for total, _ in profiles)
+
+    print(f"import main        {import_ms:8.1f} ms  (median of {args.runs}, threshold {args.max_import_ms:g})")
+    for cumulative, name in profiles[-1][1][: args.top]:
+        print(f"  {cumulative:8.1f} ms  {name}")
+
+    first_request_ms = statistics.median(asyncio.run(_first_request_runs(args.runs))) * 1000
+    print(
+        f"first request      {first_request_ms:8.1f} ms  "
+        f"(median of {args.runs}, threshold {args.max_first_request_ms:g})"
+    )
+
+    failed = []
+    if import_ms > args.max_import_ms:
+        failed.append("import")
+    if first_request_ms > args.max_first_request_ms:
+        failed.append("first request")
+    if failed:
+        print(f"REGRESSION: {', '.join(failed)} over threshold", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
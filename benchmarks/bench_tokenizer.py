@@ -0,0 +1,73 @@
+"""Per-call token counting cost before and after the tokenizer registry.
+
+Run from the repo root: python -m benchmarks.bench_tokenizer [--messages N] [--model M]
+"""
+import argparse
+import asyncio
+import random
+import time
+import tiktoken
+from utils.text import count_tokens, count_tokens_async, count_tokens_batch, get_encoding
+
+WORDS = "the agent streams tokens from the model while tools read files and run shell commands".split()
+
+
+def _legacy_count_tokens(text: str, model: str) -> int:
+    try:
+        encoding = tiktoken.encoding_for_model(model)
+    except Exception:
+        encoding = tiktoken.get_encoding("cl100k_base")
+    return len(encoding.encode(text))
+
+
+def _make_messages(count: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 400)))
+        for _ in range(count)
+    ]
+
+
+def _report(label: str, elapsed: float, count: int, baseline: float | None = None) -> None:
+    per_call_us = elapsed / count * 1e6
+    speedup = f"  ({baseline / elapsed:.1f}x)" if baseline else ""
+    print(f"{label:<28} {elapsed * 1000:9.1f} ms  {per_call_us:8.2f} us/msg{speedup}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--model", default="not-a-registered-model")
+    args = parser.parse_args()
+
+    if get_encoding(args.model) is None:
+        print("No tiktoken encoding could be loaded (offline without a BPE cache); nothing to compare.")
+        return
+
+    messages = _make_messages(args.messages)
+
+    start = time.perf_counter()
+    legacy = [_legacy_count_tokens(text, args.model) for text in messages]
+    baseline = time.perf_counter() - start
+    _report("legacy count_tokens", baseline, len(messages))
+
+    start = time.perf_counter()
+    cached = [count_tokens(text, args.model) for text in messages]
+    _report("registry count_tokens", time.perf_counter() - start, len(messages), baseline)
+
+    start = time.perf_counter()
+    batched = count_tokens_batch(messages, args.model)
+    _report("count_tokens_batch", time.perf_counter() - start, len(messages), baseline)
+
+    async def _run_async() -> list[int]:
+        return [await count_tokens_async(text, args.model) for text in messages]
+
+    start = time.perf_counter()
+    awaited = asyncio.run(_run_async())
+    _report("count_tokens_async", time.perf_counter() - start, len(messages), baseline)
+
+    assert legacy == cached == batched == awaited
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Per-request tool overhead with 50 registered tools: rebuilt vs precompiled.
+
+Covers building the `tools` payload for every request and validating one
+call's params.
+
+Run from the repo root: python -m benchmarks.bench_tool_schemas [--tools N] [--requests R]
+"""
+import argparse
+import time
+from pydantic import BaseModel, Field, ValidationError, create_model
+from pydantic.json_schema import model_json_schema
+from tools import Tool, ToolKind, ToolRegistry, ToolResult
+
+
+def _make_tool(index: int) -> Tool:
+    params = create_model(
+        f"Tool{index}Params",
+        path=(str, Field(description="Path to operate on")),
+        pattern=(str | None, Field(default=None, description="Optional glob")),
+        limit=(int, Field(default=100, ge=1, le=10_000)),
+        recursive=(bool, False),
+    )
+
+    class BenchTool(Tool):
+        name = f"tool_{index}"
+        description = f"Benchmark tool number {index}"
+        kind = ToolKind.READ
+        schema = params
+
+        async def execute(self, invocation):
+            return ToolResult(success=True, output="")
+
+    return BenchTool()
+
+
+def _legacy_payload(tools: list[Tool]) -> list[dict]:
+    payload = []
+    for tool in tools:
+        json_schema = model_json_schema(tool.schema, mode="serialization")
+        payload.append(
+            {
+                "type": "function",
+                "function": {
+                    "name": tool.name,
+                    "description": tool.description,
+                    "parameters": {
+                        "type": "object",
+                        "properties": json_schema.get("properties", {}),
+                        "required": json_schema.get("required", []),
+                    },
+                },
+            }
+        )
+    return payload
+
+
+def _legacy_validate(params: dict) -> list[str]:
+    # Mirrors the old Tool.validate_params, which instantiated BaseModel itself
+    # and so reported an error for every call
+    try:
+        BaseModel(**params)
+    except ValidationError as e:
+        return [str(e)]
+    except Exception as e:
+        return [str(e)]
+    return []
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tools", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2_000)
+    args = parser.parse_args()
+
+    tools = [_make_tool(index) for index in range(args.tools)]
+    registry = ToolRegistry()
+    for tool in tools:
+        registry.register(tool)
+
+    params = {"path": "src", "limit": 50}
+
+    start = time.perf_counter()
+    for _ in range(args.requests):
+        _legacy_payload(tools)
+        _legacy_validate(params)
+    legacy = (time.perf_counter() - start) / args.requests
+
+    start = time.perf_counter()
+    for _ in range(args.requests):
+        registry.get_openai_tools()
+        tools[0].validate_params(params)
+    cached = (time.perf_counter() - start) / args.requests
+
+    print(f"{args.tools} tools, {args.requests} requests")
+    print(f"legacy schema + validate  {legacy * 1e6:10.1f} us/request")
+    print(f"precompiled               {cached * 1e6:10.1f} us/request  ({legacy / cached:.0f}x)")
+    print(f"invalid params now caught: {tools[0].validate_params({'limit': 0})}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Rendering cost of 100k small deltas: print-per-delta vs the coalescing TUI.
+
+Output goes to /dev/null through a Console forced into terminal mode, so the
+numbers are rendering overhead only; a slow terminal or SSH link adds to the
+per-write cost and widens the gap.
+
+Run from the repo root: python -m benchmarks.bench_tui_render [--deltas N]
+"""
+import argparse
+import asyncio
+import os
+import time
+from rich.console import Console
+from ui.tui import AGENT_THEME, TUI
+
+
+def _console(terminal: bool, file) -> Console:
+    return Console(theme=AGENT_THEME, highlight=False, force_terminal=terminal, file=file)
+
+
+def _legacy(console: Console, deltas: list[str]) -> None:
+    for content in deltas:
+        console.print(content, end="", markup=False)
+
+
+async def _coalesced(tui: TUI, deltas: list[str], yield_every: int) -> None:
+    tui.begin_assitant()
+    for index, content in enumerate(deltas):
+        tui.stream_assistant_delta(content)
+        if index % yield_every == 0:
+            # Let scheduled flushes run, as they would between network reads
+            await asyncio.sleep(0)
+    tui.end_assistant()
+
+
+def _time(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--deltas", type=int, default=100_000)
+    parser.add_argument("--newline-every", type=int, default=40)
+    args = parser.parse_args()
+
+    deltas = [
+        "tok\n" if index % args.newline_every == args.newline_every - 1 else "tok "
+        for index in range(args.deltas)
+    ]
+
+    with open(os.devnull, "w") as devnull:
+        legacy = _time(lambda: _legacy(_console(True, devnull), deltas))
+        print(f"legacy print per delta   {legacy:8.3f} s  {legacy / len(deltas) * 1e6:7.2f} us/delta")
+
+        for label, terminal, markdown in (
+            ("coalesced, terminal", True, False),
+            ("coalesced, markdown", True, True),
+            ("coalesced, not a tty", False, False),
+        ):
+            tui = TUI(_console(terminal, devnull), frame_rate=30, markdown=markdown)
+            elapsed = _time(lambda: asyncio.run(_coalesced(tui, deltas, 64)))
+            print(
+                f"{label:<24} {elapsed:8.3f} s  {elapsed / len(deltas) * 1e6:7.2f} us/delta"
+                f"  ({legacy / elapsed:.0f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
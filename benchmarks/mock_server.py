@@ -0,0 +1,300 @@
+"""Local OpenAI-compatible chat-completions stand-in that streams SSE chunks.
+
+Token rate, chunk size, the trailing usage block, 429 responses and
+mid-stream connection drops are all configurable, so client overhead can be
+measured and failure handling exercised without network access.
+
+Run from the repo root: python -m benchmarks.mock_server [--port 8765] [--help]
+Point BASE_URL at http://127.0.0.1:<port>/v1 to use it.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass
+
+
+@dataclass
+class MockSettings:
+    tokens: int = 64
+    token_text: str = "tok "
+    # Tokens per SSE chunk
+    chunk_size: int = 1
+    tokens_per_second: float = 0.0
+    first_token_delay: float = 0.0
+    include_usage: bool = True
+    # Fraction of requests answered with 429, and the Retry-After sent with them
+    rate_limit_rate: float = 0.0
+    retry_after: float | None = None
+    # Fraction of streams whose connection is dropped after drop_after tokens
+    drop_rate: float = 0.0
+    drop_after: int = 8
+    seed: int | None = None
+    # Send each chunk's wall-clock send time ("@<unix time>") instead of token_text,
+    # so a client can measure delta latency end to end
+    timestamp_tokens: bool = False
+
+
+class MockServer:
+    def __init__(
+        self,
+        settings: MockSettings | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.settings = settings or MockSettings()
+        self.host = host
+        self.port = port
+        self.connections = 0
+        self.requests = 0
+        self.rate_limited = 0
+        self.dropped = 0
+        # Connections the client closed while a response was being written
+        self.disconnected = 0
+        self._random = random.Random(self.settings.seed)
+        self._server: asyncio.base_events.Server | None = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    async def start(self) -> MockServer:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> MockServer:
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                self.requests += 1
+                try:
+                    await self._respond(writer, request)
+                except ConnectionError:
+                    self.disconnected += 1
+                    raise
+        except (ConnectionError, asyncio.IncompleteReadError, _DropConnection):
+            pass
+        except asyncio.CancelledError:
+            # Idle keep-alive connections are cancelled when the loop shuts down
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer: asyncio.StreamWriter, request: dict) -> None:
+        settings = self.settings
+        model = request.get("model") or "mock-model"
+
+        if settings.rate_limit_rate and self._random.random() < settings.rate_limit_rate:
+            self.rate_limited += 1
+            _write_json(writer, 429, _rate_limit_error(), _retry_after_headers(settings.retry_after))
+            await writer.drain()
+            return
+
+        # Like a real provider, stop at max_tokens with finish_reason "length"
+        tokens = settings.tokens
+        finish_reason = "stop"
+        max_tokens = request.get("max_tokens")
+        if max_tokens is not None and max_tokens < tokens:
+            tokens, finish_reason = max_tokens, "length"
+
+        if not request.get("stream"):
+            content = settings.token_text * tokens
+            _write_json(writer, 200, _completion(model, content, tokens, finish_reason))
+            await writer.drain()
+            return
+
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+            b"Transfer-Encoding: chunked\r\n\r\n"
+        )
+
+        drop_at = None
+        if settings.drop_rate and self._random.random() < settings.drop_rate:
+            drop_at = settings.drop_after
+
+        if settings.first_token_delay:
+            await asyncio.sleep(settings.first_token_delay)
+
+        chunk_size = max(1, settings.chunk_size)
+        interval = chunk_size / settings.tokens_per_second if settings.tokens_per_second else 0
+        sent = 0
+        while sent < tokens:
+            if drop_at is not None and sent >= drop_at:
+                self.dropped += 1
+                await writer.drain()
+                writer.transport.abort()
+                raise _DropConnection()
+
+            count = min(chunk_size, tokens - sent)
+            text = f"@{time.time():.6f}" if settings.timestamp_tokens else settings.token_text * count
+            _write_event(writer, _chunk(model, {"content": text}))
+            await writer.drain()
+            sent += count
+            if interval and sent < tokens:
+                await asyncio.sleep(interval)
+
+        _write_event(writer, _chunk(model, {}, finish_reason=finish_reason))
+        if settings.include_usage:
+            _write_event(writer, {**_chunk(model, {}), "choices": [], "usage": _usage(tokens)})
+        _write_chunk(writer, b"data: [DONE]\n\n")
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+
+class _DropConnection(Exception):
+    pass
+
+
+async def _read_request(reader: asyncio.StreamReader) -> dict | None:
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError:
+        return None
+
+    length = 0
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value.strip())
+
+    body = await reader.readexactly(length) if length else b"{}"
+    return json.loads(body)
+
+
+def _write_json(
+    writer: asyncio.StreamWriter,
+    status: int,
+    data: dict,
+    headers: dict[str, str] | None = None,
+) -> None:
+    body = json.dumps(data).encode()
+    reason = {200: "OK", 429: "Too Many Requests"}.get(status, "Error")
+    head = f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+    for name, value in (headers or {}).items():
+        head += f"{name}: {value}\r\n"
+    head += f"Content-Length: {len(body)}\r\n\r\n"
+    writer.write(head.encode() + body)
+
+
+def _retry_after_headers(retry_after: float | None) -> dict[str, str]:
+    if retry_after is None:
+        return {}
+    return {"Retry-After": f"{retry_after:g}", "retry-after-ms": f"{retry_after * 1000:.0f}"}
+
+
+def _rate_limit_error() -> dict:
+    return {
+        "error": {
+            "message": "Rate limit exceeded (mock)",
+            "type": "rate_limit_error",
+            "code": 429,
+        }
+    }
+
+
+def _write_chunk(writer: asyncio.StreamWriter, payload: bytes) -> None:
+    writer.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+
+
+def _write_event(writer: asyncio.StreamWriter, data: dict) -> None:
+    _write_chunk(writer, b"data: " + json.dumps(data).encode() + b"\n\n")
+
+
+def _chunk(model: str, delta: dict, finish_reason: str | None = None) -> dict:
+    return {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+def _usage(completion_tokens: int) -> dict:
+    return {
+        "prompt_tokens": 10,
+        "completion_tokens": completion_tokens,
+        "total_tokens": 10 + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": 0},
+    }
+
+
+def _completion(model: str, content: str, completion_tokens: int, finish_reason: str = "stop") -> dict:
+    return {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion",
+        "created": 0,
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": finish_reason,
+            }
+        ],
+        "usage": _usage(completion_tokens),
+    }
+
+
+async def _serve(settings: MockSettings, port: int) -> None:
+    async with MockServer(settings, port=port) as server:
+        print(f"mock server listening on {server.base_url}", flush=True)
+        await asyncio.Event().wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tokens", type=int, default=64)
+    parser.add_argument("--chunk-size", type=int, default=1)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--first-token-delay", type=float, default=0.0)
+    parser.add_argument("--no-usage", action="store_true")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=None)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--drop-after", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--timestamp-tokens", action="store_true")
+    args = parser.parse_args()
+
+    settings = MockSettings(
+        tokens=args.tokens,
+        chunk_size=args.chunk_size,
+        tokens_per_second=args.tokens_per_second,
+        first_token_delay=args.first_token_delay,
+        include_usage=not args.no_usage,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        drop_rate=args.drop_rate,
+        drop_after=args.drop_after,
+        seed=args.seed,
+        timestamp_tokens=args.timestamp_tokens,
+    )
+
+    try:
+        asyncio.run(_serve(settings, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,40 @@
-from .llm_client import LLMClient
-from .response import StreamEventType, StreamEvent, TokenUsage
+# Exports resolve on first access so that importing a light submodule
+# (e.g. client.response) doesn't pull in openai and httpx
+_EXPORTS = {
+    "LLMClient": ".llm_client",
+    "ResponseCache": ".cache",
+    "get_response_cache": ".cache",
+    "ClientPool": ".pool",
+    "PoolSettings": ".pool",
+    "get_client_pool": ".pool",
+    "StreamEventType": ".response",
+    "StreamEvent": ".response",
+    "TextDeltaEvent": ".response",
+    "MessageCompleteEvent": ".response",
+    "ErrorEvent": ".response",
+    "TokenUsage": ".response",
+    "Endpoint": ".router",
+    "EndpointRouter": ".router",
+    "get_router": ".router",
+    "RateLimiter": ".ratelimit",
+    "RateLimitPermit": ".ratelimit",
+    "get_rate_limiter": ".ratelimit",
+    "RunLimits": ".stream",
+    "StreamControl": ".stream",
+    "PartialStreamMode": ".retry",
+    "RetryPolicy": ".retry",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    import importlib
+
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
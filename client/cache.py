@@ -0,0 +1,200 @@
+from __future__ import annotations
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any
+from config import config
+from client.response import TokenUsage
+
+# Request fields that don't change the response content
+IGNORED_KEYS = frozenset({"stream", "stream_options"})
+
+REPLAY_CHUNK_CHARS = 64
+
+
+@dataclass
+class CachedResponse:
+    content: str | None
+    finish_reason: str | None = None
+    usage: TokenUsage | None = None
+
+    def iter_chunks(self, size: int = REPLAY_CHUNK_CHARS):
+        content = self.content or ""
+        for start in range(0, len(content), size):
+            yield content[start:start + size]
+
+
+class ResponseCache:
+    """SQLite-backed response cache keyed by a canonical hash of the request."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        ttl: float | None = None,
+        max_bytes: int | None = None,
+    ) -> None:
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._in_flight: dict[str, asyncio.Future[CachedResponse | None]] = {}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                content TEXT,
+                finish_reason TEXT,
+                usage TEXT,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)"
+        )
+        self._total_bytes: int = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    @staticmethod
+    def make_key(kwargs: dict[str, Any]) -> str:
+        canonical = json.dumps(
+            {key: value for key, value in kwargs.items() if key not in IGNORED_KEYS},
+            sort_keys=True,
+            separators=(",", ":"),
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> CachedResponse | None:
+        row = self._db.execute(
+            "SELECT content, finish_reason, usage, created_at FROM responses WHERE key = ?",
+            (key,),
+        ).fetchone()
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        content, finish_reason, usage, created_at = row
+        now = time.time()
+        if self.ttl is not None and now - created_at > self.ttl:
+            self._delete(key)
+            self.misses += 1
+            return None
+
+        self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return CachedResponse(
+            content=content,
+            finish_reason=finish_reason,
+            usage=TokenUsage(**json.loads(usage)) if usage else None,
+        )
+
+    def put(self, key: str, response: CachedResponse) -> None:
+        usage = json.dumps(asdict(response.usage)) if response.usage else None
+        size = len(key) + len((response.content or "").encode("utf-8")) + len(usage or "")
+        now = time.time()
+
+        previous = self._db.execute(
+            "SELECT size FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        self._db.execute(
+            """
+            INSERT OR REPLACE INTO responses
+                (key, content, finish_reason, usage, size, created_at, accessed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (key, response.content, response.finish_reason, usage, size, now, now),
+        )
+        self._total_bytes += size - (previous[0] if previous else 0)
+        self._evict()
+
+    def in_flight(self, key: str) -> asyncio.Future[CachedResponse | None] | None:
+        return self._in_flight.get(key)
+
+    def begin(self, key: str) -> asyncio.Future[CachedResponse | None]:
+        """Mark a request as in flight; returns the existing future if one already is."""
+        future = self._in_flight.get(key)
+        if future is None or future.done():
+            future = self._in_flight[key] = asyncio.get_running_loop().create_future()
+        return future
+
+    def finish(
+        self,
+        key: str,
+        future: asyncio.Future[CachedResponse | None],
+        response: CachedResponse | None,
+    ) -> None:
+        # Only the request that owns the in-flight slot clears it
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
+        if response is not None:
+            self.put(key, response)
+        if not future.done():
+            future.set_result(response)
+
+    def close(self) -> None:
+        self._db.close()
+
+    def _delete(self, key: str) -> None:
+        row = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        if row:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._total_bytes -= row[0]
+
+    def _evict(self) -> None:
+        if self.max_bytes is None or self._total_bytes <= self.max_bytes:
+            return
+
+        # Expired entries go first, then least recently used
+        if self.ttl is not None:
+            cutoff = time.time() - self.ttl
+            expired = self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses WHERE created_at < ?", (cutoff,)
+            ).fetchone()[0]
+            if expired:
+                self._db.execute("DELETE FROM responses WHERE created_at < ?", (cutoff,))
+                self._total_bytes -= expired
+
+        while self._total_bytes > self.max_bytes:
+            rows = self._db.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at LIMIT 64"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                return
+
+            for key, size in rows:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total_bytes -= size
+                if self._total_bytes <= self.max_bytes:
+                    return
+
+
+_cache: ResponseCache | None = None
+
+
+def get_response_cache() -> ResponseCache | None:
+    global _cache
+    if _cache is None and config.RESPONSE_CACHE_PATH:
+        _cache = ResponseCache(
+            config.RESPONSE_CACHE_PATH,
+            ttl=config.RESPONSE_CACHE_TTL,
+            max_bytes=config.RESPONSE_CACHE_MAX_BYTES,
+        )
+
+    return _cache
@@ -1,125 +1,445 @@
-from openai import APIConnectionError, RateLimitError, AsyncOpenAI, APIError
+from openai import APIConnectionError, RateLimitError, AsyncOpenAI, APIError, AsyncAPIResponse
+from openai._constants import RAW_RESPONSE_HEADER
 import asyncio
-from typing import Any, AsyncGenerator
+import httpx
+import json
+import time
+from contextlib import aclosing, asynccontextmanager
+from typing import Any, AsyncGenerator, AsyncIterator
 from config import config
-from client.response import StreamEvent, TokenUsage
+from client.response import StreamEvent, StreamEventType, TextDeltaEvent, TokenUsage
+from client.cache import CachedResponse, ResponseCache, get_response_cache
+from client.pool import ClientPool, get_client_pool
+from client.retry import RETRYABLE_ERRORS, RetryPolicy, RetryState, StreamDivergedError, StreamReplayFilter
+from client.ratelimit import PRIORITY_INTERACTIVE, RateLimiter, RateLimitPermit, get_rate_limiter
+from client.router import Endpoint, EndpointRouter, get_router
+from client.stream import StreamControl, controlled_stream
+from metrics import RequestTrace, get_tracer
+from utils.text import estimate_tokens
 
 class LLMClient:
-    def __init__(self) -> None:
-        self._client : AsyncOpenAI | None = None
-        self._max_retries: int = config.MAX_RETRIES
+    def __init__(
+        self,
+        base_url: str | None = None,
+        api_key: str | None = None,
+        pool: ClientPool | None = None,
+        retry_policy: RetryPolicy | None = None,
+        cache: ResponseCache | None = None,
+        router: EndpointRouter | None = None,
+    ) -> None:
+        # Pooled clients this LLMClient holds a reference to, by (base_url, api_key, shard)
+        self._clients: dict[tuple[str | None, str | None, int], AsyncOpenAI] = {}
+        self._requests = 0
+        self._retry_policy = retry_policy or RetryPolicy()
+        self._base_url = base_url or config.BASE_URL
+        self._api_key = api_key or config.OPENROUTER_API_KEY
+        self._pool = pool or get_client_pool()
+        self._cache = cache or get_response_cache()
+        # An explicit base_url pins this client to that endpoint
+        self._router = router or (get_router() if base_url is None else None)
 
     def get_client(self) -> AsyncOpenAI:
-        if self._client is None:
-            self._client = AsyncOpenAI(
-                api_key=config.OPENROUTER_API_KEY,
-                base_url=config.BASE_URL,
-            )
-        return self._client
+        router = self._router
+        if router is not None:
+            # The endpoint the next request would most likely go to; no attempt is made on it
+            endpoint = router.choose()
+            router.abandon(endpoint)
+            return self._client_for(endpoint.base_url, endpoint.api_key)
+        return self._client_for(self._base_url, self._api_key)
+
+    def _client_for(self, base_url: str | None, api_key: str | None) -> AsyncOpenAI:
+        # Requests rotate over the pool's shards of the endpoint
+        shard = self._requests % self._pool.settings.shards
+        self._requests += 1
+        key = (base_url, api_key, shard)
+        client = self._clients.get(key)
+        if client is None:
+            client = self._clients[key] = self._pool.acquire(base_url, api_key, shard)
+        return client
+
+    async def warm_up(self) -> None:
+        """Connect to the endpoint now so the first request skips the handshake."""
+        await self._pool.warm(self.get_client())
 
     async def close(self) -> None:
-        if self._client:
-            await self._client.close()
-            self._client = None
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await self._pool.release(client)
 
     async def chat_completion(
         self, 
         messages: list[dict[str, Any]],
-        stream: bool=True
+        stream: bool=True,
+        session_id: str | None = None,
+        prompt_tokens: int | None = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        control: StreamControl | None = None,
+    ) -> AsyncGenerator[StreamEvent, None]:
+        """Stream a completion.
+
+        `prompt_tokens` is the caller's count of `messages` (the context
+        manager already has it); it is estimated when missing. Together with
+        `priority` it decides when a rate-limited request is let through.
+        `control` carries the run's output limits and lets the caller cancel
+        the request mid-stream.
+        """
+        trace = RequestTrace(config.DEFAULT_AI_MODEL, stream, session_id)
+        if prompt_tokens is None:
+            prompt_tokens = sum(
+                estimate_tokens(message["content"])
+                for message in messages if isinstance(message.get("content"), str)
+            )
+        max_tokens = control.limits.max_completion_tokens if control is not None else None
+        completion_estimate = config.RATE_LIMIT_COMPLETION_ESTIMATE
+        if max_tokens is not None:
+            completion_estimate = min(completion_estimate, max_tokens)
+        charge = prompt_tokens + completion_estimate
+
+        source = self._complete(messages, stream, trace, (charge, priority), max_tokens)
+        try:
+            async with aclosing(controlled_stream(source, control, prompt_tokens=prompt_tokens)) as events:
+                async for event in events:
+                    trace.observe(event)
+                    yield event
+        finally:
+            get_tracer().emit(trace.finish())
+
+    async def _complete(
+        self,
+        messages: list[dict[str, Any]],
+        stream: bool,
+        trace: RequestTrace,
+        budget: tuple[int, int],
+        max_tokens: int | None = None,
     ) -> AsyncGenerator[StreamEvent, None]:
-        client = self.get_client()
+        # With a router, _request picks the endpoint (and its client) per attempt
+        client = self.get_client() if self._router is None else None
 
         kwargs = {
             "model": config.DEFAULT_AI_MODEL,
             "messages": messages,
             "stream": stream
         }
-    
-        for attempt in range(self._max_retries + 1):
-            try:
-                if stream:
-                    async for event in self._stream_response(client, kwargs):
+        if max_tokens is not None:
+            kwargs["max_tokens"] = max_tokens
+        if stream:
+            kwargs["stream_options"] = {"include_usage": True}
+
+        if self._cache is None:
+            async for event in self._request(client, kwargs, trace, budget):
+                yield event
+            return
+
+        key = self._cache.make_key(kwargs)
+        cached = self._cache.get(key)
+        while cached is None:
+            pending = self._cache.in_flight(key)
+            if pending is None:
+                break
+            # An identical request is already running; wait for its result. If
+            # it fails, the first waiter to wake takes over and the rest wait on it
+            cached = await asyncio.shield(pending)
+
+        if cached is not None:
+            trace.cached = True
+            for event in self._replay(cached, stream):
+                yield event
+            return
+
+        # Nothing is in flight for the key (checked above, with no await since)
+        future = self._cache.begin(key)
+        content: list[str] = []
+        response: CachedResponse | None = None
+        try:
+            async for event in self._request(client, kwargs, trace, budget):
+                if event.text_delta:
+                    content.append(event.text_delta.content)
+                if event.type == StreamEventType.MESSAGE_COMPLETE:
+                    response = CachedResponse(
+                        content="".join(content),
+                        finish_reason=event.finish_reason,
+                        usage=event.usage,
+                    )
+                yield event
+        finally:
+            self._cache.finish(key, future, response)
+
+    def _replay(self, cached: CachedResponse, stream: bool) -> list[StreamEvent]:
+        if not stream:
+            return [
+                StreamEvent.create_msg_complete(cached.finish_reason, cached.usage, cached.content)
+            ]
+
+        events = [StreamEvent.create_delta(chunk) for chunk in cached.iter_chunks()]
+        events.append(StreamEvent.create_msg_complete(cached.finish_reason, cached.usage))
+        return events
+
+    async def _request(
+        self,
+        client: AsyncOpenAI | None,
+        kwargs: dict[str, Any],
+        trace: RequestTrace | None = None,
+        budget: tuple[int, int] = (0, PRIORITY_INTERACTIVE),
+    ) -> AsyncGenerator[StreamEvent, None]:
+        stream = kwargs["stream"]
+        charge, priority = budget
+        retry_state = self._retry_policy.begin()
+        emitted: list[str] = []
+        router = self._router
+        # Endpoint of the attempt in flight, until its outcome is recorded
+        endpoint: Endpoint | None = None
+        failed: set[Endpoint] = set()
+        # Rate limit charge of the attempt in flight, until it is settled
+        permit: RateLimitPermit | None = None
+
+        try:
+            while True:
+                if router is not None and not emitted:
+                    # Once output has been sent the request stays on its endpoint:
+                    # another model's reply would diverge from it
+                    endpoint = router.choose(failed) or router.choose()
+                    client = self._client_for(endpoint.base_url, endpoint.api_key)
+                    kwargs = {**kwargs, "model": endpoint.model}
+                    if trace is not None:
+                        trace.model = endpoint.model
+                        trace.endpoint = endpoint.label
+
+                limiter = self._limiter_for(endpoint)
+                if limiter is not None:
+                    permit = await limiter.acquire(charge, priority)
+                    if trace is not None:
+                        trace.rate_limit_wait += permit.waited
+
+                replay = StreamReplayFilter("".join(emitted)) if emitted else None
+                started = time.perf_counter()
+                ttft: float | None = None
+                usage: TokenUsage | None = None
+                try:
+                    if stream:
+                        async for event in self._stream_response(client, kwargs):
+                            if event.type == StreamEventType.TEXT_DELTA and event.text_delta:
+                                if ttft is None:
+                                    ttft = time.perf_counter() - started
+                                content = event.text_delta.content
+                                if replay:
+                                    content = replay.feed(content)
+                                    if not content:
+                                        continue
+                                    if content is not event.text_delta.content:
+                                        event = StreamEvent.create_delta(content)
+
+                                emitted.append(content)
+
+                            elif event.type == StreamEventType.MESSAGE_COMPLETE:
+                                usage = event.usage
+                                if replay and not replay.caught_up:
+                                    raise StreamDivergedError(
+                                        "Retried stream ended before reaching output already sent"
+                                    )
+
+                            yield event
+                    else:
+                        event = await self._non_stream_response(client, kwargs)
+                        ttft = time.perf_counter() - started
+                        usage = event.usage
                         yield event
-                else:
-                    event = await self._non_stream_response(client, kwargs)
-                    yield event
-                return 
-
-            except RateLimitError as e:
-                if attempt < self._max_retries:
-                    wait_time = 2**attempt
-                    await asyncio.sleep(wait_time)
-                else:
-                    yield StreamEvent.create_error(f"Rate Limit Error: {e}")
-                    return
 
-            except APIConnectionError as e:
-                if attempt < self._max_retries:
-                    wait_time = 2**attempt
-                    await asyncio.sleep(wait_time)
-                else:
-                    yield StreamEvent.create_error(f"Connection error: {e}")
+                    if permit is not None:
+                        permit.settle(usage.total_tokens if usage else None)
+                        permit = None
+                    if endpoint is not None:
+                        router.record_success(endpoint, ttft)
+                        endpoint = None
+                    return 
+
+                except RateLimitError as e:
+                    if permit is not None:
+                        # Rejected outright: the request counted, its tokens didn't
+                        permit.settle(0)
+                        permit = None
+                    delay = self._retry_delay(retry_state, e, bool(emitted), endpoint, failed)
+                    if delay is None:
+                        yield StreamEvent.create_error(f"Rate Limit Error: {e}")
+                        return
+                    await asyncio.sleep(delay)
+
+                except APIConnectionError as e:
+                    delay = self._retry_delay(retry_state, e, bool(emitted), endpoint, failed)
+                    if delay is None:
+                        yield StreamEvent.create_error(f"Connection error: {e}")
+                        return
+                    await asyncio.sleep(delay)
+
+                except APIError as e:
+                    delay = self._retry_delay(retry_state, e, bool(emitted), endpoint, failed)
+                    if delay is None:
+                        yield StreamEvent.create_error(f"API error: {e}")
+                        return
+                    await asyncio.sleep(delay)
+
+                except StreamDivergedError as e:
+                    yield StreamEvent.create_error(f"Stream error: {e}")
                     return
 
-            except APIError as e:
-                yield StreamEvent.create_error(f"API error: {e}")
-                return
-                
+                if permit is not None:
+                    permit.settle(None)
+                    permit = None
+                if trace is not None:
+                    trace.retries += 1
+        finally:
+            if permit is not None:
+                permit.settle(None)
+            if endpoint is not None:
+                # Cancelled, or failed in a way that says nothing about the endpoint
+                router.abandon(endpoint)
+
+    def _limiter_for(self, endpoint: Endpoint | None) -> RateLimiter | None:
+        if endpoint is None:
+            return get_rate_limiter(self._base_url, name=self._base_url or "default")
+        return get_rate_limiter(endpoint, endpoint.rpm, endpoint.tpm, endpoint.label)
+
+    def _retry_delay(
+        self,
+        retry_state: RetryState,
+        error: Exception,
+        partial: bool,
+        endpoint: Endpoint | None,
+        failed: set[Endpoint],
+    ) -> float | None:
+        """Seconds to wait before the next attempt, or None to give up."""
+        router = self._router
+        if endpoint is None or router is None:
+            return retry_state.next_delay(error, partial=partial)
+
+        if not isinstance(error, RETRYABLE_ERRORS):
+            return retry_state.next_delay(error, partial=partial)
+
+        router.record_failure(endpoint)
+        if not partial:
+            failed.add(endpoint)
+            if router.has_available(failed):
+                # Fail over straight away; the backoff is for when every endpoint is struggling
+                return 0.0
+            failed.clear()
+
+        return retry_state.next_delay(error, partial=partial)
+
     async def _stream_response(
         self,
         client: AsyncOpenAI,
         kwargs: dict[str, Any]
     ) -> AsyncGenerator[StreamEvent, None]:
-        response = await client.chat.completions.create(**kwargs)
-
         usage: TokenUsage | None = None
         finish_reason : str | None = None
 
-        async for chunk in response:
-            if hasattr(chunk, "usage") and chunk.usage:
-                usage = TokenUsage(
-                    prompt_tokens=chunk.usage.prompt_tokens,
-                    completion_tokens=chunk.usage.completion_tokens,
-                    total_tokens=chunk.usage.total_tokens,
-                    cached_tokens=chunk.usage.prompt_tokens_details.cached_tokens,
-                )
+        async with self._open_stream(client, kwargs) as response:
+            async for chunk in self._iter_chunks(response):
+                chunk_usage = chunk.get("usage")
+                if chunk_usage:
+                    usage = _parse_usage(chunk_usage)
 
-            if not chunk.choices:
-                continue
-            
-            choice = chunk.choices[0]
-            delta = choice.delta
-            content = delta.content
+                choices = chunk.get("choices")
+                if not choices:
+                    continue
+                
+                choice = choices[0]
+                content = (choice.get("delta") or {}).get("content")
 
-            if choice.finish_reason:
-                finish_reason = choice.finish_reason
+                if choice.get("finish_reason"):
+                    finish_reason = choice["finish_reason"]
 
-            if content:
-                yield StreamEvent.create_delta(content)
+                if content:
+                    yield TextDeltaEvent(content)
 
         yield StreamEvent.create_msg_complete(finish_reason, usage)
+
+    @asynccontextmanager
+    async def _open_stream(
+        self,
+        client: AsyncOpenAI,
+        kwargs: dict[str, Any],
+    ) -> AsyncIterator[AsyncAPIResponse[Any]]:
+        # The request chat.completions.with_streaming_response makes, without going
+        # through client.chat: first access to that resource imports the SDK's chat
+        # types, about half of a one-shot CLI run's time to first request.
+        response = await client.post(
+            "/chat/completions",
+            body=kwargs,
+            cast_to=object,
+            stream=True,
+            options={"headers": {RAW_RESPONSE_HEADER: "stream"}},
+        )
+        try:
+            yield response
+        finally:
+            await response.close()
+
+    async def _iter_chunks(
+        self,
+        response: AsyncAPIResponse[Any],
+    ) -> AsyncGenerator[dict[str, Any], None]:
+        # AsyncStream closes the response at [DONE] without reading the end of
+        # the chunked body, which makes httpx discard the connection. Reading the
+        # SSE lines ourselves to EOF hands the connection back to the pool.
+        # Chunks stay plain dicts: building ChatCompletionChunk models per token
+        # cost more than everything else on the streaming path combined.
+        done = False
+        async for line in self._iter_lines(response):
+            if done or not line.startswith("data:"):
+                continue
+
+            data = line[5:].strip()
+            if data == "[DONE]":
+                done = True
+                continue
+
+            payload = json.loads(data)
+            error = payload.get("error")
+            if error:
+                message = error.get("message") if isinstance(error, dict) else None
+                raise APIError(
+                    message=message or "An error occurred during streaming",
+                    request=response.http_request,
+                    body=error,
+                )
+
+            yield payload
         
 
+    async def _iter_lines(
+        self,
+        response: AsyncAPIResponse[Any],
+    ) -> AsyncGenerator[str, None]:
+        # The SDK only maps transport failures to APIConnectionError while sending
+        # the request; a connection dropped mid-body surfaces as a raw httpx error.
+        try:
+            async for line in response.iter_lines():
+                yield line
+        except httpx.TransportError as e:
+            raise APIConnectionError(request=response.http_request) from e
+
     async def _non_stream_response(
         self,
         client: AsyncOpenAI,
         kwargs: dict[str, Any]
     ) -> StreamEvent: 
-        response = await client.chat.completions.create(**kwargs)
-        choice = response.choices[0]
-        message = choice.message
-        content = message.content
-        finish_reason = choice.finish_reason
-        
-        usage = None
-        if response.usage:
-            usage = TokenUsage(
-                prompt_tokens=response.usage.prompt_tokens,
-                completion_tokens=response.usage.completion_tokens,
-                total_tokens=response.usage.total_tokens,
-                cached_tokens=response.usage.prompt_tokens_details.cached_tokens,
-            )
+        # Same raw request as _open_stream, so non-streaming runs skip the chat types too
+        response = await client.post("/chat/completions", body=kwargs, cast_to=object)
+        choice = response["choices"][0]
+        content = (choice.get("message") or {}).get("content")
+        finish_reason = choice.get("finish_reason")
+
+        usage = _parse_usage(response["usage"]) if response.get("usage") else None
 
         return StreamEvent.create_msg_complete(finish_reason, usage, content)
-      
-        
\ No newline at end of file
+
+
+def _parse_usage(usage: dict[str, Any]) -> TokenUsage:
+    details = usage.get("prompt_tokens_details") or {}
+    return TokenUsage(
+        prompt_tokens=usage.get("prompt_tokens") or 0,
+        completion_tokens=usage.get("completion_tokens") or 0,
+        total_tokens=usage.get("total_tokens") or 0,
+        cached_tokens=details.get("cached_tokens") or 0,
+    )
@@ -0,0 +1,171 @@
+from __future__ import annotations
+import asyncio
+import importlib.util
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+from config import config
+
+if TYPE_CHECKING:
+    import httpx
+    from openai import AsyncOpenAI
+
+PoolKey = tuple[str | None, str | None, int]
+
+
+@dataclass
+class PoolSettings:
+    max_connections: int = config.HTTP_MAX_CONNECTIONS
+    max_keepalive_connections: int = config.HTTP_MAX_KEEPALIVE_CONNECTIONS
+    keepalive_expiry: float = config.HTTP_KEEPALIVE_EXPIRY
+    http2: bool = config.HTTP2
+    # Clients per endpoint, splitting max_connections between them
+    shards: int = config.HTTP_POOL_SHARDS
+
+
+@dataclass
+class _PoolEntry:
+    client: AsyncOpenAI
+    http_client: httpx.AsyncClient
+    loop: asyncio.AbstractEventLoop
+    refs: int = 0
+    idle_handle: asyncio.TimerHandle | None = None
+
+
+class ClientPool:
+    """Process-wide, reference-counted AsyncOpenAI clients keyed by (base_url, api_key, shard).
+
+    Clients that drop to zero references stay warm for the keep-alive expiry
+    so the next agent can reuse their connections, then get closed.
+
+    With more than one shard an endpoint gets several clients, each with its
+    share of the connection limit. httpcore scans every connection of a pool
+    whenever a request starts or ends, which gets expensive with hundreds of
+    concurrent HTTP/1.1 streams on one pool; sharding keeps each scan short.
+    """
+
+    def __init__(self, settings: PoolSettings | None = None) -> None:
+        self.settings = settings or PoolSettings()
+        self._entries: dict[PoolKey, _PoolEntry] = {}
+        self._closing: set[asyncio.Task] = set()
+
+    def acquire(self, base_url: str | None, api_key: str | None, shard: int = 0) -> AsyncOpenAI:
+        key = (base_url, api_key, shard % self.settings.shards)
+        loop = asyncio.get_running_loop()
+        entry = self._entries.get(key)
+
+        # httpx connections are bound to the loop that opened them
+        if entry is None or entry.loop is not loop or entry.client.is_closed():
+            client, http_client = self._create_client(base_url, api_key)
+            entry = _PoolEntry(client=client, http_client=http_client, loop=loop)
+            self._entries[key] = entry
+
+        if entry.idle_handle:
+            entry.idle_handle.cancel()
+            entry.idle_handle = None
+
+        entry.refs += 1
+        return entry.client
+
+    async def release(self, client: AsyncOpenAI) -> None:
+        for key, entry in self._entries.items():
+            if entry.client is client:
+                break
+        else:
+            await client.close()
+            return
+
+        entry.refs -= 1
+        if entry.refs > 0:
+            return
+
+        if self.settings.keepalive_expiry <= 0:
+            await self._close_entry(key, entry)
+            return
+
+        entry.idle_handle = entry.loop.call_later(
+            self.settings.keepalive_expiry, self._schedule_close, key, entry
+        )
+
+    async def warm(self, client: AsyncOpenAI) -> None:
+        """Open a connection (TCP and TLS) to the client's endpoint ahead of its first request."""
+        entry = next((entry for entry in self._entries.values() if entry.client is client), None)
+        if entry is None:
+            return
+
+        try:
+            # Any status will do; the point is the pooled keep-alive connection
+            await entry.http_client.head(str(client.base_url))
+        except Exception:
+            pass
+
+    def stats(self) -> dict[PoolKey, int]:
+        return {key: entry.refs for key, entry in self._entries.items()}
+
+    async def aclose(self) -> None:
+        for key, entry in list(self._entries.items()):
+            await self._close_entry(key, entry, force=True)
+
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+
+    def _schedule_close(self, key: PoolKey, entry: _PoolEntry) -> None:
+        task = entry.loop.create_task(self._close_entry(key, entry))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close_entry(
+        self,
+        key: PoolKey,
+        entry: _PoolEntry,
+        force: bool = False,
+    ) -> None:
+        if entry.idle_handle:
+            entry.idle_handle.cancel()
+            entry.idle_handle = None
+
+        if entry.refs > 0 and not force:
+            return
+
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+        await entry.client.close()
+
+    def _create_client(
+        self,
+        base_url: str | None,
+        api_key: str | None,
+    ) -> tuple[AsyncOpenAI, httpx.AsyncClient]:
+        # Deferred: openai is the bulk of CLI startup and only needed once a request is made
+        import httpx
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+        settings = self.settings
+        shards = settings.shards
+        http_client = DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=-(-settings.max_connections // shards),
+                max_keepalive_connections=-(-settings.max_keepalive_connections // shards),
+                keepalive_expiry=settings.keepalive_expiry,
+            ),
+            # HTTP/2 needs the optional h2 package
+            http2=settings.http2 and importlib.util.find_spec("h2") is not None,
+        )
+        client = AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            http_client=http_client,
+            # LLMClient's RetryPolicy owns retries; stacking the SDK's own on top multiplies them
+            max_retries=0,
+        )
+        return client, http_client
+
+
+_pool: ClientPool | None = None
+
+
+def get_client_pool() -> ClientPool:
+    global _pool
+    if _pool is None:
+        _pool = ClientPool()
+
+    return _pool
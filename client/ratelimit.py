@@ -0,0 +1,219 @@
+from __future__ import annotations
+import asyncio
+import heapq
+import itertools
+import time
+from dataclasses import dataclass, field
+from config import config
+from metrics import get_registry
+
+# Request priorities: lower values are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+
+class TokenBucket:
+    """Refills continuously at `capacity` per minute.
+
+    The level may go negative when a request turns out to have cost more
+    than it was charged; later requests then wait for the debt to refill.
+    """
+
+    __slots__ = ("capacity", "rate", "level", "updated")
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` can be taken; amounts over capacity only need a full bucket."""
+        missing = min(amount, self.capacity) - self.level
+        return missing / self.rate if missing > 0 else 0.0
+
+    def take(self, amount: float) -> None:
+        self.level -= amount
+
+    def give(self, amount: float) -> None:
+        self.level = min(self.capacity, self.level + amount)
+
+
+@dataclass
+class RateLimitPermit:
+    limiter: RateLimiter
+    tokens: int
+    waited: float
+    settled: bool = False
+
+    def settle(self, actual_tokens: int | None) -> None:
+        """Correct the up-front charge to what the request actually used.
+
+        None keeps the estimate (the provider's count is unknown); 0 refunds
+        it, for requests rejected before doing any work.
+        """
+        if self.settled:
+            return
+        self.settled = True
+        if actual_tokens is not None:
+            self.limiter.adjust(actual_tokens - self.tokens)
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    sequence: int
+    tokens: int = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued_at: float = field(compare=False)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute budget for one endpoint.
+
+    Callers that would exceed either budget queue instead of failing and are
+    admitted in priority order, first come first served within a priority.
+    Only the head of the queue can be admitted, so a large request is never
+    starved by a stream of smaller ones slipping past it.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        name: str = "default",
+    ) -> None:
+        self.name = name
+        self._requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._queue: list[_Waiter] = []
+        self._sequence = itertools.count()
+        self._wakeup: asyncio.TimerHandle | None = None
+
+        registry = get_registry()
+        self._depth = registry.gauge(
+            "ratelimit_queue_depth", "Requests waiting for rate limit budget", endpoint=name
+        )
+        self._wait = registry.histogram(
+            "ratelimit_wait_seconds", "Time requests spent queued for rate limit budget", endpoint=name
+        )
+        self._throttled = registry.counter(
+            "ratelimit_throttled_total", "Requests that had to wait for rate limit budget", endpoint=name
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    async def acquire(self, tokens: int, priority: int = PRIORITY_INTERACTIVE) -> RateLimitPermit:
+        """Wait until one request of `tokens` fits in the budget, then charge it."""
+        now = time.monotonic()
+        if not self._queue and self._wait_time(tokens, now) <= 0:
+            self._charge(tokens)
+            self._wait.observe(0.0)
+            return RateLimitPermit(self, tokens, 0.0)
+
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(priority, next(self._sequence), tokens, loop.create_future(), now)
+        heapq.heappush(self._queue, waiter)
+        self._depth.set(len(self._queue))
+        self._throttled.inc()
+        self._dispatch()
+
+        try:
+            return await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted in the same tick as the cancel: hand the budget back
+                waiter.future.result().settle(0)
+                self._refund_request()
+            elif waiter in self._queue:
+                self._queue.remove(waiter)
+                heapq.heapify(self._queue)
+                self._depth.set(len(self._queue))
+            self._dispatch()
+            raise
+
+    def adjust(self, tokens: int) -> None:
+        """Charge (positive) or refund (negative) tokens outside of acquire."""
+        if self._tokens is None or not tokens:
+            return
+        self._tokens.refill(time.monotonic())
+        if tokens > 0:
+            self._tokens.take(tokens)
+        else:
+            self._tokens.give(-tokens)
+            self._dispatch()
+
+    def _refund_request(self) -> None:
+        if self._requests is not None:
+            self._requests.give(1)
+
+    def _wait_time(self, tokens: int, now: float) -> float:
+        wait = 0.0
+        if self._requests is not None:
+            self._requests.refill(now)
+            wait = self._requests.wait_time(1)
+        if self._tokens is not None:
+            self._tokens.refill(now)
+            wait = max(wait, self._tokens.wait_time(tokens))
+        return wait
+
+    def _charge(self, tokens: int) -> None:
+        if self._requests is not None:
+            self._requests.take(1)
+        if self._tokens is not None:
+            self._tokens.take(tokens)
+
+    def _dispatch(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+
+        while self._queue:
+            head = self._queue[0]
+            if head.future.done():
+                heapq.heappop(self._queue)
+                continue
+
+            now = time.monotonic()
+            wait = self._wait_time(head.tokens, now)
+            if wait > 0:
+                loop = head.future.get_loop()
+                self._wakeup = loop.call_later(wait, self._dispatch)
+                break
+
+            heapq.heappop(self._queue)
+            self._charge(head.tokens)
+            waited = now - head.enqueued_at
+            self._wait.observe(waited)
+            head.future.set_result(RateLimitPermit(self, head.tokens, waited))
+
+        self._depth.set(len(self._queue))
+
+
+_limiters: dict[object, RateLimiter | None] = {}
+
+
+def get_rate_limiter(
+    key: object,
+    requests_per_minute: float | None = None,
+    tokens_per_minute: float | None = None,
+    name: str | None = None,
+) -> RateLimiter | None:
+    """The limiter shared by every client sending to `key`, or None when it's unlimited.
+
+    Limits default to RATE_LIMIT_RPM / RATE_LIMIT_TPM and are fixed by the
+    first call for a key.
+    """
+    if key not in _limiters:
+        rpm = config.RATE_LIMIT_RPM if requests_per_minute is None else requests_per_minute
+        tpm = config.RATE_LIMIT_TPM if tokens_per_minute is None else tokens_per_minute
+        _limiters[key] = (
+            RateLimiter(rpm, tpm, name or str(key)) if rpm > 0 or tpm > 0 else None
+        )
+    return _limiters[key]
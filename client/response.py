@@ -1,8 +1,9 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from enum import Enum
+from typing import ClassVar
 
-@dataclass
+@dataclass(slots=True)
 class TextDelta:
     content: str
 
@@ -14,7 +15,7 @@ class StreamEventType(str, Enum):
     MESSAGE_COMPLETE = "message_complete"
     ERROR = "error"
 
-@dataclass
+@dataclass(slots=True)
 class TokenUsage:
     prompt_tokens: int = 0
     completion_tokens: int = 0
@@ -29,10 +30,13 @@ class TokenUsage:
             cached_tokens=self.cached_tokens + other.cached_tokens,
         )
 
-@dataclass
 class StreamEvent:
-    type: StreamEventType 
-    text_delta: TextDelta | None = None 
+    """Base for the typed stream events; fields a subtype doesn't carry read as None."""
+
+    __slots__ = ()
+
+    type: ClassVar[StreamEventType]
+    text_delta: TextDelta | None = None
     error: str | None = None
     finish_reason: str | None = None
     usage: TokenUsage | None = None
@@ -42,20 +46,14 @@ class StreamEvent:
         cls,
         error: str,
     ) -> StreamEvent:
-        return cls(
-            type=StreamEventType.ERROR,
-            error=error,
-        )
+        return ErrorEvent(error)
 
     @classmethod
     def create_delta(
         cls,
         content: str,
     ) -> StreamEvent:
-        return cls(
-            type=StreamEventType.TEXT_DELTA,
-            text_delta=TextDelta(content)
-        )
+        return TextDeltaEvent(content)
 
     @classmethod
     def create_msg_complete(
@@ -65,9 +63,25 @@ class StreamEvent:
         content: str | None = None
     ) -> StreamEvent:
         delta = TextDelta(content) if content else None
-        return cls(
-            type=StreamEventType.MESSAGE_COMPLETE,
-            finish_reason=finish_reason,
-            usage=usage,
-            text_delta=delta
-        )
+        return MessageCompleteEvent(finish_reason, usage, delta)
+
+@dataclass(slots=True)
+class TextDeltaEvent(TextDelta, StreamEvent):
+    # One allocation per streamed token: the event is its own TextDelta
+    type: ClassVar[StreamEventType] = StreamEventType.TEXT_DELTA
+
+    @property
+    def text_delta(self) -> TextDelta:
+        return self
+
+@dataclass(slots=True)
+class MessageCompleteEvent(StreamEvent):
+    type: ClassVar[StreamEventType] = StreamEventType.MESSAGE_COMPLETE
+    finish_reason: str | None = None
+    usage: TokenUsage | None = None
+    text_delta: TextDelta | None = None
+
+@dataclass(slots=True)
+class ErrorEvent(StreamEvent):
+    type: ClassVar[StreamEventType] = StreamEventType.ERROR
+    error: str
@@ -0,0 +1,130 @@
+from __future__ import annotations
+import random
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from enum import Enum
+from openai import APIConnectionError, APIStatusError, InternalServerError, RateLimitError
+from config import config
+
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, InternalServerError)
+
+
+class PartialStreamMode(str, Enum):
+    # Re-request and drop the replayed prefix if it matches what was already sent
+    DEDUPE = "dedupe"
+    # Never retry once any delta has been yielded
+    SUPPRESS = "suppress"
+
+
+class StreamDivergedError(Exception):
+    pass
+
+
+@dataclass
+class RetryPolicy:
+    max_retries: int = config.MAX_RETRIES
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    # Total wall-clock budget for one request including all retries, in seconds
+    deadline: float | None = 120.0
+    partial_stream_mode: PartialStreamMode = PartialStreamMode.DEDUPE
+    honor_retry_after: bool = True
+
+    def begin(self) -> RetryState:
+        return RetryState(self)
+
+    def backoff(self, previous_delay: float) -> float:
+        # Decorrelated jitter: spreads concurrent clients apart instead of retrying in lockstep
+        upper = max(self.base_delay, previous_delay * 3)
+        return min(self.max_delay, random.uniform(self.base_delay, upper))
+
+
+@dataclass
+class RetryState:
+    policy: RetryPolicy
+    attempts: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    previous_delay: float = 0.0
+
+    def next_delay(self, error: Exception, partial: bool = False) -> float | None:
+        """Seconds to wait before retrying `error`, or None to give up."""
+        policy = self.policy
+        if not isinstance(error, RETRYABLE_ERRORS):
+            return None
+
+        if self.attempts >= policy.max_retries:
+            return None
+
+        if partial and policy.partial_stream_mode == PartialStreamMode.SUPPRESS:
+            return None
+
+        delay = policy.backoff(self.previous_delay)
+        if policy.honor_retry_after:
+            retry_after = get_retry_after(error)
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+
+        if policy.deadline is not None:
+            remaining = policy.deadline - (time.monotonic() - self.started_at)
+            if delay >= remaining:
+                return None
+
+        self.attempts += 1
+        self.previous_delay = delay
+        return delay
+
+
+def get_retry_after(error: Exception) -> float | None:
+    if not isinstance(error, APIStatusError):
+        return None
+
+    headers = error.response.headers
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return max(0.0, float(retry_after_ms) / 1000)
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class StreamReplayFilter:
+    """Drops the prefix of a retried stream that was already yielded downstream."""
+
+    def __init__(self, emitted: str) -> None:
+        self._emitted = emitted
+        self._offset = 0
+
+    @property
+    def caught_up(self) -> bool:
+        return self._offset >= len(self._emitted)
+
+    def feed(self, content: str) -> str:
+        if self.caught_up:
+            return content
+
+        expected = self._emitted[self._offset:self._offset + len(content)]
+        if not content.startswith(expected):
+            raise StreamDivergedError(
+                f"Retried stream diverged from output already sent at offset {self._offset}"
+            )
+
+        self._offset += len(expected)
+        return content[len(expected):]
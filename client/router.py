@@ -0,0 +1,230 @@
+from __future__ import annotations
+import json
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any
+from config import config
+
+# Weight of the newest sample in the moving averages
+EWMA_ALPHA = 0.2
+# Error rate at which an endpoint's score doubles
+ERROR_PENALTY = 1.0
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    base_url: str | None
+    # Kept out of the repr so logging an endpoint doesn't leak the key
+    api_key: str | None = field(repr=False)
+    model: str | None
+    weight: float = 1.0
+    # Fallback endpoints only take traffic when every primary one is unavailable
+    fallback: bool = False
+    name: str = ""
+    # Client-side limits; None uses RATE_LIMIT_RPM / RATE_LIMIT_TPM
+    rpm: float | None = None
+    tpm: float | None = None
+
+    @property
+    def label(self) -> str:
+        return self.name or f"{self.model}@{self.base_url}"
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Endpoint:
+        api_key = data.get("api_key")
+        if api_key is None and data.get("api_key_env"):
+            api_key = os.getenv(data["api_key_env"])
+
+        return cls(
+            base_url=data.get("base_url") or config.BASE_URL,
+            api_key=api_key or config.OPENROUTER_API_KEY,
+            model=data.get("model") or config.DEFAULT_AI_MODEL,
+            weight=float(data.get("weight", 1.0)),
+            fallback=bool(data.get("fallback", False)),
+            name=data.get("name", ""),
+            rpm=data.get("rpm"),
+            tpm=data.get("tpm"),
+        )
+
+
+@dataclass
+class EndpointHealth:
+    ttft: float | None = None
+    error_rate: float = 0.0
+    consecutive_failures: int = 0
+    state: CircuitState = CircuitState.CLOSED
+    opened_at: float = 0.0
+    # Set while the single half-open probe request is in flight
+    probing: bool = False
+    requests: int = 0
+    failures: int = 0
+
+
+@dataclass
+class CircuitBreakerPolicy:
+    # Consecutive 429/5xx/connection failures that open the circuit
+    failure_threshold: int = config.ROUTER_FAILURE_THRESHOLD
+    # Seconds an open circuit waits before letting one probe request through
+    cooldown: float = config.ROUTER_COOLDOWN
+
+
+class EndpointRouter:
+    """Routes each request to the healthiest, fastest endpoint.
+
+    Each endpoint keeps moving averages of time-to-first-token and error
+    rate. A request goes to the better-scoring of two weighted-random
+    candidates (power of two choices), which favours fast endpoints without
+    sending all traffic to whichever one looked best a moment ago. Endpoints
+    that keep failing get their circuit opened and take no traffic until a
+    probe succeeds after the cooldown.
+    """
+
+    def __init__(
+        self,
+        endpoints: list[Endpoint],
+        breaker: CircuitBreakerPolicy | None = None,
+    ) -> None:
+        if not endpoints:
+            raise ValueError("EndpointRouter needs at least one endpoint")
+
+        self.endpoints = endpoints
+        self.breaker = breaker or CircuitBreakerPolicy()
+        self._health: dict[Endpoint, EndpointHealth] = {
+            endpoint: EndpointHealth() for endpoint in endpoints
+        }
+        self._random = random.Random()
+
+    def health(self, endpoint: Endpoint) -> EndpointHealth:
+        return self._health[endpoint]
+
+    def choose(self, exclude: set[Endpoint] | frozenset[Endpoint] = frozenset()) -> Endpoint | None:
+        """Pick an endpoint for the next attempt; None when every one is excluded."""
+        now = time.monotonic()
+        candidates = [
+            endpoint for endpoint in self.endpoints
+            if endpoint not in exclude and self._available(endpoint, now)
+        ]
+        primary = [endpoint for endpoint in candidates if not endpoint.fallback]
+        candidates = primary or candidates
+
+        if not candidates:
+            # Every circuit is open: try the one closest to its probe rather than fail outright
+            remaining = [endpoint for endpoint in self.endpoints if endpoint not in exclude]
+            if not remaining:
+                return None
+            return min(remaining, key=lambda endpoint: self._health[endpoint].opened_at)
+
+        if len(candidates) == 1:
+            chosen = candidates[0]
+        else:
+            weights = [endpoint.weight for endpoint in candidates]
+            first, second = self._random.choices(candidates, weights, k=2)
+            chosen = min(first, second, key=self._score)
+
+        health = self._health[chosen]
+        if health.state == CircuitState.OPEN:
+            health.state = CircuitState.HALF_OPEN
+        if health.state == CircuitState.HALF_OPEN:
+            health.probing = True
+        return chosen
+
+    def has_available(self, exclude: set[Endpoint] | frozenset[Endpoint] = frozenset()) -> bool:
+        now = time.monotonic()
+        return any(
+            endpoint not in exclude and self._available(endpoint, now)
+            for endpoint in self.endpoints
+        )
+
+    def abandon(self, endpoint: Endpoint) -> None:
+        """The attempt ended without saying anything about the endpoint's health."""
+        self._health[endpoint].probing = False
+
+    def record_success(self, endpoint: Endpoint, ttft: float | None) -> None:
+        health = self._health[endpoint]
+        health.requests += 1
+        health.consecutive_failures = 0
+        health.error_rate *= 1 - EWMA_ALPHA
+        if ttft is not None:
+            health.ttft = ttft if health.ttft is None else (
+                health.ttft + EWMA_ALPHA * (ttft - health.ttft)
+            )
+        health.state = CircuitState.CLOSED
+        health.probing = False
+
+    def record_failure(self, endpoint: Endpoint) -> None:
+        health = self._health[endpoint]
+        health.requests += 1
+        health.failures += 1
+        health.consecutive_failures += 1
+        health.error_rate += EWMA_ALPHA * (1 - health.error_rate)
+        health.probing = False
+
+        if (
+            health.state == CircuitState.HALF_OPEN
+            or health.consecutive_failures >= self.breaker.failure_threshold
+        ):
+            health.state = CircuitState.OPEN
+            health.opened_at = time.monotonic()
+
+    def _available(self, endpoint: Endpoint, now: float) -> bool:
+        health = self._health[endpoint]
+        if health.state == CircuitState.CLOSED:
+            return True
+        if health.state == CircuitState.HALF_OPEN:
+            return not health.probing
+        return now - health.opened_at >= self.breaker.cooldown
+
+    def _score(self, endpoint: Endpoint) -> float:
+        health = self._health[endpoint]
+        # Unmeasured endpoints score as fastest so they get sampled
+        ttft = health.ttft or 0.0
+        return ttft * (1 + health.error_rate / ERROR_PENALTY) + health.error_rate
+
+
+def load_endpoints() -> list[Endpoint]:
+    """Endpoints from LLM_ENDPOINTS (a JSON list, or a path to one) plus FALLBACK_AI_MODEL."""
+    endpoints: list[Endpoint] = []
+
+    raw = config.LLM_ENDPOINTS
+    if raw:
+        if not raw.lstrip().startswith("["):
+            with open(raw, encoding="utf-8") as f:
+                raw = f.read()
+        endpoints = [Endpoint.from_dict(item) for item in json.loads(raw)]
+
+    if config.FALLBACK_AI_MODEL:
+        if not endpoints:
+            endpoints.append(Endpoint(config.BASE_URL, config.OPENROUTER_API_KEY, config.DEFAULT_AI_MODEL))
+        endpoints.append(
+            Endpoint(
+                config.BASE_URL,
+                config.OPENROUTER_API_KEY,
+                config.FALLBACK_AI_MODEL,
+                fallback=True,
+            )
+        )
+
+    return endpoints
+
+
+_router: EndpointRouter | None = None
+_router_loaded = False
+
+
+def get_router() -> EndpointRouter | None:
+    """The shared router, or None when only the single default endpoint is configured."""
+    global _router, _router_loaded
+    if not _router_loaded:
+        endpoints = load_endpoints()
+        _router = EndpointRouter(endpoints) if endpoints else None
+        _router_loaded = True
+    return _router
@@ -0,0 +1,220 @@
+from __future__ import annotations
+import asyncio
+import time
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import AsyncGenerator, AsyncIterator, Callable
+from client.response import StreamEvent, StreamEventType, TokenUsage
+from config import config
+from utils.text import estimate_tokens
+
+# Finish reasons for streams the client ended early ("length" comes from
+# the provider, which enforces max_tokens itself)
+FINISH_LENGTH = "length"
+FINISH_STOP = "stop"
+FINISH_TIMEOUT = "timeout"
+FINISH_CANCELLED = "cancelled"
+
+
+@dataclass(frozen=True)
+class RunLimits:
+    # Sent as max_tokens; the provider ends the stream with finish_reason "length"
+    max_completion_tokens: int | None = None
+    # Wall-clock seconds from the start of the run
+    deadline: float | None = None
+    # Output is cut before the first of these; never sent to the provider
+    stop: tuple[str, ...] = ()
+
+
+class StreamControl:
+    """Limits and cancellation for one run, shared down to the HTTP stream.
+
+    `cancel()` (or the deadline passing) ends the stream being read: the
+    HTTP response is closed, so the provider stops generating, and the
+    consumer gets a final MESSAGE_COMPLETE with the reason as finish_reason
+    and an estimated usage, since the provider's usage block never arrives.
+    """
+
+    def __init__(self, limits: RunLimits | None = None) -> None:
+        self.limits = limits or RunLimits()
+        self.reason: str | None = None
+        self.expires_at = (
+            time.monotonic() + self.limits.deadline if self.limits.deadline else None
+        )
+        self._listeners: list[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    def cancel(self, reason: str = FINISH_CANCELLED) -> None:
+        if self.reason is not None:
+            return
+        self.reason = reason
+        for listener in self._listeners:
+            listener()
+
+    def _listen(self, listener: Callable[[], None]) -> Callable[[], None]:
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+
+class _StopFilter:
+    """Cuts text before the first stop sequence, across delta boundaries.
+
+    Up to len(longest stop) - 1 characters are held back, since they might
+    be the start of a stop sequence the next delta completes.
+    """
+
+    __slots__ = ("stops", "holdback", "pending")
+
+    def __init__(self, stops: tuple[str, ...]) -> None:
+        self.stops = stops
+        self.holdback = max(len(stop) for stop in stops) - 1
+        self.pending = ""
+
+    def feed(self, content: str) -> tuple[str, bool]:
+        """Text safe to emit now, and whether a stop sequence was reached."""
+        text = self.pending + content
+        cut = min((index for index in map(text.find, self.stops) if index != -1), default=-1)
+        if cut != -1:
+            self.pending = ""
+            return text[:cut], True
+
+        split = max(0, len(text) - self.holdback)
+        self.pending = text[split:]
+        return text[:split], False
+
+    def flush(self) -> str:
+        text, self.pending = self.pending, ""
+        return text
+
+
+_DONE = object()
+
+
+async def controlled_stream(
+    source: AsyncGenerator[StreamEvent, None],
+    control: StreamControl | None = None,
+    buffer_size: int | None = None,
+    prompt_tokens: int = 0,
+) -> AsyncIterator[StreamEvent]:
+    """Read `source` in its own task through a bounded queue, applying `control`.
+
+    A full queue stops the reader, so a slow consumer slows the network read
+    instead of buffering without limit. However this generator ends (limit
+    reached, cancelled, or the consumer closing it) the reader is cancelled
+    and `source` closed, which closes the HTTP response. `prompt_tokens`
+    goes into the usage estimated for a stream cut short.
+    """
+    control = control or StreamControl()
+    limits = control.limits
+    size = config.STREAM_BUFFER_SIZE if buffer_size is None else buffer_size
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, size))
+
+    async def read() -> None:
+        try:
+            async with aclosing(source):
+                async for event in source:
+                    await queue.put(event)
+        except Exception as e:
+            await queue.put(e)
+        await queue.put(_DONE)
+
+    loop = asyncio.get_running_loop()
+    reader = loop.create_task(read())
+
+    def close_reader() -> None:
+        # Cancel once only: a second cancel would interrupt the reader while
+        # it closes the HTTP response, leaving the connection streaming
+        if not reader.done() and not reader.cancelling():
+            reader.cancel()
+
+    def wake() -> None:
+        close_reader()
+        # Unblock a consumer waiting on an empty queue; a non-empty one is
+        # checked before its next item
+        if queue.empty():
+            queue.put_nowait(_DONE)
+
+    unlisten = control._listen(wake)
+    timer = None
+    if control.expires_at is not None:
+        timer = loop.call_at(
+            loop.time() + control.expires_at - time.monotonic(),
+            control.cancel,
+            FINISH_TIMEOUT,
+        )
+
+    stop = _StopFilter(limits.stop) if limits.stop else None
+    # Text passed on so far, for the usage of a stream cut short
+    completion_tokens = 0
+
+    try:
+        while True:
+            if control.cancelled:
+                if stop is not None and control.reason != FINISH_STOP:
+                    # Text held back for a stop sequence that never came
+                    held = stop.flush()
+                    if held:
+                        completion_tokens += estimate_tokens(held)
+                        yield StreamEvent.create_delta(held)
+                usage = TokenUsage(
+                    prompt_tokens=prompt_tokens,
+                    completion_tokens=completion_tokens,
+                    total_tokens=prompt_tokens + completion_tokens,
+                )
+                yield StreamEvent.create_msg_complete(control.reason, usage)
+                return
+
+            event = await queue.get()
+            if event is _DONE:
+                if control.cancelled:
+                    continue
+                return
+            if isinstance(event, Exception):
+                raise event
+
+            if event.type == StreamEventType.TEXT_DELTA:
+                content = event.text_delta.content
+                reached = False
+                if stop is not None:
+                    content, reached = stop.feed(content)
+                    if reached:
+                        control.cancel(FINISH_STOP)
+                    if not content:
+                        continue
+                    if content is not event.text_delta.content:
+                        event = StreamEvent.create_delta(content)
+
+                completion_tokens += estimate_tokens(content)
+
+            elif event.type == StreamEventType.MESSAGE_COMPLETE and stop is not None:
+                if event.text_delta:
+                    # Non-streaming reply: the whole text arrives here
+                    content, reached = stop.feed(event.text_delta.content)
+                    content += "" if reached else stop.flush()
+                    if reached:
+                        control.cancel(FINISH_STOP)
+                    yield StreamEvent.create_msg_complete(
+                        FINISH_STOP if reached else event.finish_reason,
+                        event.usage,
+                        content,
+                    )
+                    return
+
+                held = stop.flush()
+                if held:
+                    yield StreamEvent.create_delta(held)
+
+            yield event
+    finally:
+        unlisten()
+        if timer is not None:
+            timer.cancel()
+        close_reader()
+        try:
+            await reader
+        except asyncio.CancelledError:
+            if not reader.cancelled():
+                raise
@@ -10,4 +10,104 @@ class Config:
     
     MAX_RETRIES = 3
 
+    # Routing: LLM_ENDPOINTS is a JSON list (or a path to one) of
+    # {base_url, api_key | api_key_env, model, weight, fallback, name};
+    # FALLBACK_AI_MODEL adds a fallback endpoint for the default BASE_URL
+    LLM_ENDPOINTS = os.getenv("LLM_ENDPOINTS")
+    FALLBACK_AI_MODEL = os.getenv("FALLBACK_AI_MODEL")
+    ROUTER_FAILURE_THRESHOLD = int(os.getenv("ROUTER_FAILURE_THRESHOLD", "5"))
+    ROUTER_COOLDOWN = float(os.getenv("ROUTER_COOLDOWN", "30"))
+
+    # Client-side rate limits per endpoint (0 = unlimited); an endpoint in
+    # LLM_ENDPOINTS can override them with "rpm"/"tpm". Requests are charged
+    # their prompt tokens plus RATE_LIMIT_COMPLETION_ESTIMATE up front and
+    # settled against the reported usage when they finish
+    RATE_LIMIT_RPM = float(os.getenv("RATE_LIMIT_RPM", "0"))
+    RATE_LIMIT_TPM = float(os.getenv("RATE_LIMIT_TPM", "0"))
+    RATE_LIMIT_COMPLETION_ESTIMATE = int(os.getenv("RATE_LIMIT_COMPLETION_ESTIMATE", "512"))
+
+    # Stream events read ahead of the consumer; a full buffer pauses the network read
+    STREAM_BUFFER_SIZE = int(os.getenv("STREAM_BUFFER_SIZE", "64"))
+
+    # HTTP connection pool
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+    HTTP2 = os.getenv("HTTP2", "1") == "1"
+    # Split each endpoint's connections across this many clients; helps with
+    # hundreds of concurrent HTTP/1.1 streams (e.g. --serve)
+    HTTP_POOL_SHARDS = max(1, int(os.getenv("HTTP_POOL_SHARDS", "1")))
+
+    # Terminal rendering
+    UI_FRAME_RATE = float(os.getenv("UI_FRAME_RATE", "30"))
+    UI_MARKDOWN = os.getenv("UI_MARKDOWN", "0") == "1"
+
+    # Response cache (opt-in: set RESPONSE_CACHE_PATH to enable)
+    RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH")
+    RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "0")) or None
+    RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+    # Tool output: the model sees at most TOOL_OUTPUT_MAX_TOKENS (head + tail);
+    # past TOOL_OUTPUT_MEMORY_LIMIT characters the full output spills to disk
+    TOOL_OUTPUT_MAX_TOKENS = int(os.getenv("TOOL_OUTPUT_MAX_TOKENS", "8000"))
+    TOOL_OUTPUT_MEMORY_LIMIT = int(os.getenv("TOOL_OUTPUT_MEMORY_LIMIT", str(1024 * 1024)))
+    TOOL_OUTPUT_SPILL_DIR = os.getenv("TOOL_OUTPUT_SPILL_DIR")
+
+    # Read-only tool results, reused while the files they read are unchanged
+    # (0 disables)
+    TOOL_CACHE_MAX_BYTES = int(os.getenv("TOOL_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+    # Metrics: always kept in-process; optionally exported as a Prometheus
+    # text file and/or a JSONL span log
+    METRICS_PROMETHEUS_PATH = os.getenv("METRICS_PROMETHEUS_PATH")
+    METRICS_SPAN_LOG_PATH = os.getenv("METRICS_SPAN_LOG_PATH")
+
+    # Conversation logs for --resume
+    SESSION_DIR = os.getenv("SESSION_DIR", "~/.agentic/sessions")
+
+    # Background compaction: summarize the oldest turns past the high-water
+    # mark (fraction of the input budget) until the total is under the low-water mark
+    COMPACTION_ENABLED = os.getenv("COMPACTION_ENABLED", "1") == "1"
+    COMPACTION_HIGH_WATER = float(os.getenv("COMPACTION_HIGH_WATER", "0.8"))
+    COMPACTION_LOW_WATER = float(os.getenv("COMPACTION_LOW_WATER", "0.5"))
+    COMPACTION_KEEP_RECENT = int(os.getenv("COMPACTION_KEEP_RECENT", "4"))
+    # After a failed summary, wait this long before the next attempt, doubling
+    # per consecutive failure up to the max
+    COMPACTION_RETRY_DELAY = float(os.getenv("COMPACTION_RETRY_DELAY", "5"))
+    COMPACTION_RETRY_MAX_DELAY = float(os.getenv("COMPACTION_RETRY_MAX_DELAY", "300"))
+
+    # Tokenizer: BPE files live in a persistent local cache, also seeded from
+    # tiktoken's own. With TOKENIZER_OFFLINE (the default) counting never
+    # downloads; fill the cache once with `python -m utils.tokenizer_cache`
+    # (at install time), else counts are estimated, with a warning
+    TOKENIZER_CACHE_DIR = os.getenv("TOKENIZER_CACHE_DIR", "~/.cache/agentic/tiktoken")
+    TOKENIZER_OFFLINE = os.getenv("TOKENIZER_OFFLINE", "1") == "1"
+
+    # WebSocket server (--serve). Sessions idle past SERVER_IDLE_TIMEOUT, or the
+    # least recently used ones once the resident contexts hold more than
+    # SERVER_MAX_RESIDENT_TOKENS, are dropped from memory and reloaded from
+    # their session log on the next message
+    SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+    SERVER_PORT = int(os.getenv("SERVER_PORT", "8765"))
+    SERVER_IDLE_TIMEOUT = float(os.getenv("SERVER_IDLE_TIMEOUT", "300"))
+    SERVER_MAX_RESIDENT_TOKENS = int(os.getenv("SERVER_MAX_RESIDENT_TOKENS", "5000000"))
+
+    # Context window
+    CONTEXT_WINDOW = os.getenv("CONTEXT_WINDOW")
+    DEFAULT_CONTEXT_WINDOW = 128000
+    MODEL_CONTEXT_WINDOWS: dict[str, int] = {
+        "openai/gpt-4o": 128000,
+        "openai/gpt-4o-mini": 128000,
+        "openai/gpt-4.1": 1047576,
+        "anthropic/claude-sonnet-4": 200000,
+        "anthropic/claude-3.5-sonnet": 200000,
+        "google/gemini-2.5-pro": 1048576,
+    }
+    RESERVED_OUTPUT_TOKENS = int(os.getenv("RESERVED_OUTPUT_TOKENS", "4096"))
+
+    def get_context_window(self, model: str | None) -> int:
+        if self.CONTEXT_WINDOW:
+            return int(self.CONTEXT_WINDOW)
+        return self.MODEL_CONTEXT_WINDOWS.get(model or "", self.DEFAULT_CONTEXT_WINDOW)
+
 config = Config()
@@ -1 +1,3 @@
 from .manager import ContextManager
+from .session import Session, SessionStore
+from .compaction import CompactionStats, ContextCompactor
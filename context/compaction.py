@@ -0,0 +1,213 @@
+from __future__ import annotations
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, List
+from client.ratelimit import PRIORITY_BACKGROUND
+from client.response import StreamEventType
+from config import config
+from context.manager import MessageItem, MESSAGE_OVERHEAD_TOKENS
+from metrics import Span, get_tracer
+from utils import count_tokens
+
+if TYPE_CHECKING:
+    from client import LLMClient
+    from context.manager import ContextManager
+
+SUMMARY_PREFIX = "[Summary of the earlier conversation]\n"
+
+SUMMARY_INSTRUCTIONS = """Summarize the conversation below so it can replace the original messages in the context of an ongoing session.
+Keep every fact, decision, file path, identifier, open question and user preference that later turns may depend on.
+Drop pleasantries and repetition. Write plain prose or terse bullet points, no preamble."""
+
+# Heads the next part of a conversation too long to summarize in one request
+LATER_MESSAGES = "\n\n[Later messages]\n"
+
+
+@dataclass
+class CompactionStats:
+    compactions: int = 0
+    failures: int = 0
+    discarded: int = 0
+    tokens_saved: int = 0
+    # Summary requests made, several per compaction when the history exceeds one request
+    requests: int = 0
+    total_latency: float = 0.0
+    last_latency: float | None = None
+
+
+class ContextCompactor:
+    """Summarizes the oldest turns in the background once the context fills up.
+
+    Past `high_water` (a fraction of the manager's input budget) a task
+    summarizes enough of the oldest messages to bring the total down to
+    `low_water`. The foreground turn keeps running on the uncompacted history;
+    the summary is swapped in only if those messages are still unchanged.
+
+    History longer than one summary request can hold is summarized in steps,
+    oldest first, each folding the next part into the summary so far. After
+    a failed summary the next attempt waits COMPACTION_RETRY_DELAY, doubling
+    per consecutive failure.
+    """
+
+    def __init__(
+        self,
+        client: LLMClient,
+        high_water: float | None = None,
+        low_water: float | None = None,
+        keep_recent: int | None = None,
+    ) -> None:
+        self.client = client
+        self.high_water = config.COMPACTION_HIGH_WATER if high_water is None else high_water
+        self.low_water = config.COMPACTION_LOW_WATER if low_water is None else low_water
+        self.keep_recent = config.COMPACTION_KEEP_RECENT if keep_recent is None else keep_recent
+        self.stats = CompactionStats()
+        self._task: asyncio.Task | None = None
+        self._consecutive_failures = 0
+        self._retry_at = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def maybe_start(self, manager: ContextManager) -> bool:
+        if self.running or time.monotonic() < self._retry_at:
+            return False
+
+        budget = manager.max_input_tokens
+        if manager.total_tokens < budget * self.high_water:
+            return False
+
+        end = manager.compaction_end(int(budget * self.low_water), self.keep_recent)
+        if end <= 0:
+            return False
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+
+        snapshot = manager.messages[:end]
+        self._task = loop.create_task(self._compact(manager, snapshot))
+        return True
+
+    async def wait(self) -> None:
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+    async def cancel(self) -> None:
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _compact(self, manager: ContextManager, snapshot: List[MessageItem]) -> None:
+        started_at = time.time()
+        start = time.perf_counter()
+        saved = await self._compact_once(manager, snapshot)
+        latency = time.perf_counter() - start
+
+        attributes = {
+            "model": manager.model_name or "unknown",
+            "status": "ok" if saved else "skipped",
+            "duration_seconds": latency,
+            "messages": len(snapshot),
+            "tokens_saved": saved or 0,
+        }
+        get_tracer().emit(Span("context.compaction", started_at, latency, attributes))
+
+        if saved is None:
+            return
+
+        self.stats.compactions += 1
+        self.stats.tokens_saved += saved
+        self.stats.total_latency += latency
+        self.stats.last_latency = latency
+
+    async def _compact_once(self, manager: ContextManager, snapshot: List[MessageItem]) -> int | None:
+        model = manager.model_name
+        budget = manager.max_input_tokens - count_tokens(SUMMARY_INSTRUCTIONS, model) - 2 * MESSAGE_OVERHEAD_TOKENS
+        try:
+            summary = await self._summarize(snapshot, model, budget)
+        except Exception:
+            summary = None
+
+        if not summary:
+            self.stats.failures += 1
+            self._consecutive_failures += 1
+            delay = min(
+                config.COMPACTION_RETRY_DELAY * 2 ** (self._consecutive_failures - 1),
+                config.COMPACTION_RETRY_MAX_DELAY,
+            )
+            self._retry_at = time.monotonic() + delay
+            return None
+
+        self._consecutive_failures = 0
+        self._retry_at = 0.0
+
+        content = SUMMARY_PREFIX + summary
+        item = MessageItem(
+            role='user',
+            content=content,
+            token_count=count_tokens(content, manager.model_name),
+        )
+
+        saved = manager.apply_compaction(snapshot, item)
+        if saved is None:
+            # History changed under us, or the summary was no smaller
+            self.stats.discarded += 1
+        return saved
+
+    async def _summarize(self, items: List[MessageItem], model: str | None, budget: int) -> str | None:
+        """Summary of `items`, in as many requests of at most `budget` input tokens as it takes."""
+        summary: str | None = None
+        index = 0
+        while index < len(items):
+            # The summary so far rides along; keep some room for messages whatever its size
+            available = budget
+            if summary:
+                available = max(budget // 4, budget - count_tokens(summary, model))
+
+            lines: List[str] = []
+            used = 0
+            while index < len(items):
+                item = items[index]
+                tokens = (item.token_count or 0) + MESSAGE_OVERHEAD_TOKENS
+                if used + tokens > available:
+                    if not lines:
+                        # A single message bigger than a request: summarize its head
+                        content = item.content[:max(1, len(item.content) * available // tokens)]
+                        lines.append(f"{item.role}: {content}")
+                        index += 1
+                    break
+                lines.append(f"{item.role}: {item.content}")
+                used += tokens
+                index += 1
+
+            transcript = "\n\n".join(lines)
+            if summary:
+                transcript = SUMMARY_PREFIX + summary + LATER_MESSAGES + transcript
+            summary = await self._request_summary(transcript)
+            if not summary:
+                return None
+        return summary
+
+    async def _request_summary(self, transcript: str) -> str | None:
+        self.stats.requests += 1
+        messages = [
+            {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+            {"role": "user", "content": transcript},
+        ]
+
+        # Background work: queue behind interactive turns when rate limited
+        async for event in self.client.chat_completion(
+            messages, stream=False, priority=PRIORITY_BACKGROUND
+        ):
+            if event.type == StreamEventType.ERROR:
+                return None
+            if event.type == StreamEventType.MESSAGE_COMPLETE and event.text_delta:
+                return event.text_delta.content.strip()
+        return None
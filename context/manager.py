@@ -1,10 +1,20 @@
-from typing import List, Any
+from __future__ import annotations
+from bisect import bisect_left
+from typing import List, Any, TYPE_CHECKING
 from utils import count_tokens
+from utils.text import estimate_tokens
 from config import config
 from prompts import get_system_prompt
 from dataclasses import dataclass
 
-@dataclass
+if TYPE_CHECKING:
+    from context.compaction import ContextCompactor
+    from context.session import Session
+
+# Per-message framing tokens the provider adds on top of the content
+MESSAGE_OVERHEAD_TOKENS = 4
+
+@dataclass(slots=True)
 class MessageItem:
     role: str
     content: str
@@ -20,10 +30,78 @@ class MessageItem:
         return result
 
 class ContextManager:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        session: Session | None = None,
+        compactor: ContextCompactor | None = None,
+    ) -> None:
+        self._session = session
+        self._compactor = compactor
         self._system_prompt = get_system_prompt()
         self._model_name=config.DEFAULT_AI_MODEL
         self._messages: List[MessageItem] = []
+        # Serialized form of _messages, extended lazily and truncated on edits
+        self._serialized: List[dict[str, Any]] = []
+        self._system_message: dict[str, Any] | None = (
+            {"role": "system", "content": self._system_prompt}
+            if self._system_prompt
+            else None
+        )
+
+        self._context_window = config.get_context_window(self._model_name)
+        self._max_input_tokens = max(
+            0, self._context_window - config.RESERVED_OUTPUT_TOKENS
+        )
+        # Counted on first use, so building a manager never waits on the tokenizer
+        self._system_tokens: int | None = None
+        # _cumulative_tokens[i] is the token total of _messages[0..i] inclusive
+        self._cumulative_tokens: List[int] = []
+
+        if session is not None:
+            # Stored token counts are reused as-is; only the window is read. The
+            # system prompt is estimated here and the window trimmed exactly when sent
+            system_estimate = estimate_tokens(self._system_prompt) + MESSAGE_OVERHEAD_TOKENS
+            self._messages = session.load_window(self._max_input_tokens - system_estimate)
+            self._rebuild_from(0)
+
+    @property
+    def session(self) -> Session | None:
+        return self._session
+
+    @property
+    def compactor(self) -> ContextCompactor | None:
+        return self._compactor
+
+    @property
+    def model_name(self) -> str | None:
+        return self._model_name
+
+    @property
+    def messages(self) -> List[MessageItem]:
+        return self._messages
+
+    @property
+    def context_window(self) -> int:
+        return self._context_window
+
+    @property
+    def max_input_tokens(self) -> int:
+        return self._max_input_tokens
+
+    @property
+    def system_tokens(self) -> int:
+        if self._system_tokens is None:
+            self._system_tokens = (
+                count_tokens(self._system_prompt, self._model_name) + MESSAGE_OVERHEAD_TOKENS
+                if self._system_prompt
+                else 0
+            )
+        return self._system_tokens
+
+    @property
+    def total_tokens(self) -> int:
+        history = self._cumulative_tokens[-1] if self._cumulative_tokens else 0
+        return self.system_tokens + history
 
     def add_user_message(self, content: str) -> None:
         item = MessageItem(
@@ -31,7 +109,7 @@ class ContextManager:
             content=content,
             token_count=count_tokens(content, self._model_name),
         )
-        self._messages.append(item)
+        self._append(item)
 
     def add_assistant_message(self, content: str) -> None:
         item = MessageItem(
@@ -39,20 +117,113 @@ class ContextManager:
             content=content or "",
             token_count=count_tokens(content, self._model_name)
         )
+        self._append(item)
+
+    def _append(self, item: MessageItem) -> None:
+        if self._session is not None:
+            self._session.append(item)
+
+        previous = self._cumulative_tokens[-1] if self._cumulative_tokens else 0
         self._messages.append(item)
+        self._cumulative_tokens.append(
+            previous + (item.token_count or 0) + MESSAGE_OVERHEAD_TOKENS
+        )
 
-    def get_messages(self) -> List[dict[str, Any]]:
-        messages = []
+        if self._compactor is not None:
+            self._compactor.maybe_start(self)
 
-        if self._system_prompt:
-            messages.append(
-                {
-                    "role": "system",
-                    "content": self._system_prompt,
-                }
-            )
-        
-        for item in self._messages:
-            messages.append(item.to_dict())
+    def compaction_end(self, target_tokens: int, keep_recent: int) -> int:
+        """End index of the oldest messages to summarize so the total falls to target_tokens."""
+        count = len(self._messages)
+        excess = self.total_tokens - target_tokens
+        if excess <= 0 or count <= keep_recent:
+            return 0
+
+        # The newest message always stays, even with keep_recent=0
+        end = min(bisect_left(self._cumulative_tokens, excess) + 1, count - keep_recent, count - 1)
+
+        # Cut on a turn boundary so the kept history still opens with a user message
+        while end > 0 and self._messages[end].role != 'user':
+            end -= 1
+        return end
+
+    def apply_compaction(self, snapshot: List[MessageItem], summary: MessageItem) -> int | None:
+        """Swap the summarized prefix for its summary; returns tokens saved, or None if stale."""
+        end = len(snapshot)
+        if len(self._messages) < end or any(
+            current is not original
+            for current, original in zip(self._messages, snapshot)
+        ):
+            return None
+
+        saved = self._cumulative_tokens[end - 1] - (
+            (summary.token_count or 0) + MESSAGE_OVERHEAD_TOKENS
+        )
+        if saved <= 0:
+            return None
+
+        self.replace_messages(0, end, [summary])
+        return saved
+
+    def replace_messages(
+        self,
+        start: int,
+        end: int,
+        items: List[MessageItem],
+    ) -> None:
+        self._messages[start:end] = items
+        self._rebuild_from(start)
+
+    def _rebuild_from(self, start: int) -> None:
+        del self._serialized[start:]
+        del self._cumulative_tokens[start:]
+
+        previous = self._cumulative_tokens[-1] if self._cumulative_tokens else 0
+        for item in self._messages[start:]:
+            previous += (item.token_count or 0) + MESSAGE_OVERHEAD_TOKENS
+            self._cumulative_tokens.append(previous)
+
+    def _window_start(self, max_tokens: int) -> int:
+        count = len(self._messages)
+        if count == 0:
+            return 0
+
+        budget = max_tokens - self.system_tokens
+        overflow = self._cumulative_tokens[-1] - budget
+        if overflow <= 0:
+            return 0
+
+        # First index whose suffix (newest messages) fits inside the budget
+        start = bisect_left(self._cumulative_tokens, overflow) + 1
+
+        # Don't open the window on a dangling assistant reply
+        while start < count and self._messages[start].role != 'user':
+            start += 1
+
+        # Always send at least the newest message, even if it alone is over budget
+        return min(start, count - 1)
+
+    def window_tokens(self, max_tokens: int | None = None) -> int:
+        """Token count of what get_messages(max_tokens) sends."""
+        if max_tokens is None:
+            max_tokens = self._max_input_tokens
+        if not self._messages:
+            return self.system_tokens
+
+        start = self._window_start(max_tokens)
+        dropped = self._cumulative_tokens[start - 1] if start else 0
+        return self.system_tokens + self._cumulative_tokens[-1] - dropped
+
+    def get_messages(self, max_tokens: int | None = None) -> List[dict[str, Any]]:
+        if max_tokens is None:
+            max_tokens = self._max_input_tokens
+
+        serialized = self._serialized
+        for item in self._messages[len(serialized):]:
+            serialized.append(item.to_dict())
+
+        start = self._window_start(max_tokens)
+        if self._system_message is None:
+            return serialized[start:]
 
-        return messages
\ No newline at end of file
+        return [self._system_message, *serialized[start:]]
@@ -0,0 +1,120 @@
+from __future__ import annotations
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Iterator, List
+from config import config
+from context.manager import MessageItem, MESSAGE_OVERHEAD_TOKENS
+
+READ_BLOCK_BYTES = 64 * 1024
+
+
+class Session:
+    """Append-only JSONL log of one conversation.
+
+    Each line holds a MessageItem with its token_count, so resuming never
+    re-tokenizes. History is read backwards from the end of the file: loading
+    the newest window costs only as much I/O as the window itself, however
+    long the session is.
+    """
+
+    def __init__(self, session_id: str, path: Path) -> None:
+        self.id = session_id
+        self.path = path
+        self._file = None
+
+    def append(self, item: MessageItem) -> None:
+        if self._file is None:
+            self._file = self.path.open("ab")
+
+        record = {
+            "role": item.role,
+            "content": item.content,
+            "token_count": item.token_count,
+        }
+        self._file.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+        self._file.flush()
+
+    def load_window(self, max_tokens: int) -> List[MessageItem]:
+        """Newest messages whose tokens fit in max_tokens (at least one)."""
+        items: List[MessageItem] = []
+        used = 0
+        for _, item in self._iter_reverse():
+            used += (item.token_count or 0) + MESSAGE_OVERHEAD_TOKENS
+            if used > max_tokens and items:
+                break
+            items.append(item)
+
+        items.reverse()
+        return items
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _iter_reverse(self, end: int | None = None) -> Iterator[tuple[int, MessageItem]]:
+        if not self.path.exists():
+            return
+
+        with self.path.open("rb") as f:
+            position = f.seek(0, os.SEEK_END) if end is None else end
+            remainder = b""
+
+            while position > 0:
+                size = min(READ_BLOCK_BYTES, position)
+                position -= size
+                f.seek(position)
+                lines = (f.read(size) + remainder).split(b"\n")
+                # The first piece may be the tail of a line that starts in an earlier block
+                remainder = lines.pop(0)
+
+                line_end = position + len(remainder) + 1
+                offsets = []
+                for line in lines:
+                    offsets.append(line_end)
+                    line_end += len(line) + 1
+
+                for offset, line in zip(reversed(offsets), reversed(lines)):
+                    item = _parse_line(line)
+                    if item is not None:
+                        yield offset, item
+
+            item = _parse_line(remainder)
+            if item is not None:
+                yield 0, item
+
+
+def _parse_line(line: bytes) -> MessageItem | None:
+    if not line.strip():
+        return None
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError:
+        # A crash mid-write can leave a truncated last line
+        return None
+    return MessageItem(
+        role=record["role"],
+        content=record.get("content") or "",
+        token_count=record.get("token_count"),
+    )
+
+
+class SessionStore:
+    def __init__(self, directory: str | Path | None = None) -> None:
+        self.directory = Path(directory or config.SESSION_DIR).expanduser()
+
+    def create(self) -> Session:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        session_id = uuid.uuid4().hex[:12]
+        return Session(session_id, self._path(session_id))
+
+    def open(self, session_id: str) -> Session:
+        path = self._path(session_id)
+        if not path.exists():
+            raise FileNotFoundError(f"No session '{session_id}' in {self.directory}")
+        return Session(session_id, path)
+
+    def _path(self, session_id: str) -> Path:
+        return self.directory / f"{session_id}.jsonl"
@@ -1,23 +1,152 @@
+import signal
 import sys
-from ui.tui import get_console
-from ui.tui import TUI
+import threading
 from agent import Agent, AgentEventType
-from typing import Any
-from client import LLMClient
+from typing import Any, TYPE_CHECKING
+from pathlib import Path
+from client import get_client_pool
+from client.stream import RunLimits
+from context import SessionStore
+from metrics import get_tracer
 import asyncio
 import click
 
-console = get_console()
+if TYPE_CHECKING:
+    from batch import BatchSummary
+
+EXIT_COMMANDS = {"/exit", "/quit"}
 
 class CLI:
-    def __init__(self):
+    def __init__(self, limits: RunLimits | None = None):
+        # rich is only loaded for the interactive front ends, not --output runs
+        from ui.tui import TUI, get_console
+
         self.agent : Agent | None = None
-        self.tui = TUI(console)
+        self.limits = limits
+        self.console = get_console()
+        self.tui = TUI(self.console)
+        self._turn: asyncio.Task | None = None
+        self._line: asyncio.Future | None = None
+
+    async def run_single(self, message: str, resume: str | None = None):
+        store = SessionStore()
+        session = store.open(resume) if resume else store.create()
+        try:
+            async with Agent(session, self.limits) as agent:
+                self.agent = agent
+                return await self._process_message(message)
+        finally:
+            await get_client_pool().aclose()
+            get_tracer().close()
+            self.console.print(f"[muted]session: {session.id} (continue with --resume {session.id})[/muted]")
+
+    async def run_interactive(self, resume: str | None = None) -> None:
+        store = SessionStore()
+        session = store.open(resume) if resume else store.create()
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGINT, self._on_interrupt)
+            handles_sigint = True
+        except (NotImplementedError, RuntimeError):
+            # No loop signal handlers here (e.g. Windows); Ctrl-C ends the REPL
+            handles_sigint = False
+
+        try:
+            async with Agent(session, self.limits) as agent:
+                self.agent = agent
+                # Runs while the user types the first prompt
+                warm_up = asyncio.create_task(agent.warm_up())
+                self.console.print("[muted]Ctrl-C stops a response; Ctrl-D or /exit quits.[/muted]")
+                try:
+                    await self._repl()
+                finally:
+                    warm_up.cancel()
+        finally:
+            if handles_sigint:
+                loop.remove_signal_handler(signal.SIGINT)
+            await get_client_pool().aclose()
+            get_tracer().close()
+            self.console.print(f"\n[muted]session: {session.id} (continue with --resume {session.id})[/muted]")
+
+    async def _repl(self) -> None:
+        while True:
+            message = await self._read_line()
+            if message is None or message.strip() in EXIT_COMMANDS:
+                return
+            if not message.strip():
+                continue
+
+            self._turn = asyncio.create_task(self._process_message(message))
+            try:
+                await self._turn
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    raise
+                self.tui.end_assistant()
+                self.console.print("[muted]Interrupted.[/muted]")
+            finally:
+                self._turn = None
+
+    def _on_interrupt(self) -> None:
+        if self._turn is not None and not self._turn.done():
+            self._turn.cancel()
+        elif self._line is not None and not self._line.done():
+            self._line.set_result(None)
+
+    async def _read_line(self) -> str | None:
+        loop = asyncio.get_running_loop()
+        self._line = loop.create_future()
+        line = self._line
+
+        def read() -> None:
+            try:
+                value = self.console.input("\n[user]> [/user]")
+            except (EOFError, KeyboardInterrupt):
+                value = None
+            loop.call_soon_threadsafe(lambda: line.done() or line.set_result(value))
+
+        # A daemon thread, not the default executor: a read abandoned by Ctrl-C
+        # must not keep the process alive at exit
+        threading.Thread(target=read, daemon=True).start()
+        return await line
+
+    async def run_batch(
+        self,
+        input_path: Path,
+        output_path: Path,
+        concurrency: int,
+    ) -> "BatchSummary":
+        from batch import BatchRunner
 
-    async def run_single(self, message: str):
-        async with Agent() as agent:
-            self.agent = agent
-            return await self._process_message(message)
+        runner = BatchRunner(input_path, output_path, concurrency)
+        try:
+            summary = await runner.run()
+        finally:
+            await get_client_pool().aclose()
+            get_tracer().close()
+
+        self._print_batch_summary(summary, output_path)
+        return summary
+
+    def _print_batch_summary(self, summary: "BatchSummary", output_path: Path) -> None:
+        def ms(value: float | None) -> str:
+            return f"{value * 1000:.0f} ms" if value is not None else "-"
+
+        self.console.print()
+        self.console.print(
+            f"[success]{summary.succeeded} succeeded[/success], "
+            f"[error]{summary.failed} failed[/error], "
+            f"[muted]{summary.skipped} skipped (already done)[/muted] "
+            f"of {summary.total} in {summary.duration:.1f}s"
+        )
+        self.console.print(
+            f"[info]throughput[/info] {summary.throughput:.2f} req/s  "
+            f"[info]latency[/info] p50 {ms(summary.percentile(summary.latencies, 50))} "
+            f"p95 {ms(summary.percentile(summary.latencies, 95))} "
+            f"p99 {ms(summary.percentile(summary.latencies, 99))}  "
+            f"[info]ttft[/info] p50 {ms(summary.percentile(summary.ttfts, 50))}"
+        )
+        self.console.print(f"[muted]results: {output_path}[/muted]")
 
     async def _process_message(self, message: str) -> str | None:
         if not self.agent:
@@ -28,19 +157,25 @@ class CLI:
 
         async for event in self.agent.run(message):
             if event.type == AgentEventType.TEXT_DELTA:
-                content = event.data.get("content", "")
+                content = event.content
                 if not assistant_streaming:
                     self.tui.begin_assitant()
                     assistant_streaming = True
                 self.tui.stream_assistant_delta(content)
             elif event.type == AgentEventType.TEXT_COMPLETE:
-                final_response = event.data.get("content")
+                final_response = event.content
                 if assistant_streaming:
-                    self.tui.end_assistant
+                    self.tui.end_assistant()
                     assistant_streaming = False
             elif event.type == AgentEventType.AGENT_ERROR:
-                error = event.data.get("error", "Unkown error")
-                console.print(f"\n[error]Error: {error}[/error]")
+                error = event.error or "Unkown error"
+                if assistant_streaming:
+                    self.tui.end_assistant()
+                    assistant_streaming = False
+                self.console.print(f"\n[error]Error: {error}[/error]")
+
+        if assistant_streaming:
+            self.tui.end_assistant()
             
         return final_response
            
@@ -49,15 +184,86 @@ class CLI:
 
 @click.command()
 @click.argument("prompt", required=False)
+@click.option(
+    "--batch",
+    "batch_path",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help="JSONL file of prompts to run concurrently.",
+)
+@click.option("--concurrency", default=8, show_default=True, help="Concurrent sessions in batch mode.")
+@click.option(
+    "--out",
+    "out_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Batch results JSONL (appended to; finished ids are skipped on rerun).",
+)
+@click.option("--resume", "resume_id", help="Continue a saved session by id.")
+@click.option(
+    "--output",
+    type=click.Choice(["json", "jsonl"]),
+    help="Headless: print the final result as JSON, or every event as JSONL. Reads the prompt from stdin if none is given.",
+)
+@click.option("--serve", is_flag=True, help="Host agent sessions over WebSocket instead of running a prompt.")
+@click.option("--port", type=int, help="Port for --serve (default SERVER_PORT).")
+@click.option("--max-tokens", type=int, help="Cut each reply after this many completion tokens.")
+@click.option("--deadline", type=float, help="Seconds a turn may run before it is cut off.")
+@click.option("--stop", multiple=True, help="Cut the reply before this text (repeatable).")
 def main(
     prompt: str | None,
+    batch_path: Path | None,
+    concurrency: int,
+    out_path: Path | None,
+    resume_id: str | None,
+    output: str | None,
+    max_tokens: int | None,
+    deadline: float | None,
+    stop: tuple[str, ...],
+    serve: bool,
+    port: int | None,
 ):
-    cli = CLI()
+    limits = None
+    if max_tokens or deadline or stop:
+        limits = RunLimits(max_tokens, deadline, stop)
+
+    if serve:
+        from server import serve as serve_sessions
+
+        try:
+            asyncio.run(serve_sessions(port=port, limits=limits))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    if output and not batch_path:
+        from ui.headless import run_headless
+
+        message = prompt if prompt is not None else sys.stdin.read()
+        try:
+            ok = asyncio.run(run_headless(message, output, resume_id, limits))
+        except FileNotFoundError as e:
+            raise click.ClickException(str(e))
+        sys.exit(0 if ok else 1)
+
+    cli = CLI(limits)
     # messages = [{'role': 'user','content': prompt}]
-    if prompt:
-        result = asyncio.run(cli.run_single(prompt))
+    if batch_path:
+        out_path = out_path or batch_path.with_suffix(".results.jsonl")
+        summary = asyncio.run(cli.run_batch(batch_path, out_path, concurrency))
+        if summary.failed:
+            sys.exit(1)
+    elif prompt:
+        try:
+            result = asyncio.run(cli.run_single(prompt, resume_id))
+        except FileNotFoundError as e:
+            raise click.ClickException(str(e))
         if result is None:
             sys.exit(1)
+    else:
+        try:
+            asyncio.run(cli.run_interactive(resume_id))
+        except FileNotFoundError as e:
+            raise click.ClickException(str(e))
     
 
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
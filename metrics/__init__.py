@@ -0,0 +1,3 @@
+from .registry import Counter, Gauge, Histogram, MetricsRegistry, get_registry
+from .tracing import RequestTrace, Span, Tracer, get_tracer
+from .sinks import JsonSpanSink, MetricsSink, PrometheusFileSink, RegistrySink
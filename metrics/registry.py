@@ -0,0 +1,180 @@
+from __future__ import annotations
+import threading
+from bisect import bisect_left
+from typing import Any, Iterable
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RATE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+LabelKey = tuple[tuple[str, str], ...]
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class Gauge:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Iterable[float]) -> None:
+        self.buckets = tuple(buckets)
+        # One slot per bucket plus +Inf; cumulated only when rendered
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """In-process counters and histograms, keyed by name and label set."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._help: dict[str, str] = {}
+        self._counters: dict[str, dict[LabelKey, Counter]] = {}
+        self._gauges: dict[str, dict[LabelKey, Gauge]] = {}
+        self._histograms: dict[str, dict[LabelKey, Histogram]] = {}
+
+    def counter(self, name: str, help: str = "", **labels: str) -> Counter:
+        family = self._family(self._counters, name, help)
+        key = _label_key(labels)
+        metric = family.get(key)
+        if metric is None:
+            with self._lock:
+                metric = family.setdefault(key, Counter())
+        return metric
+
+    def gauge(self, name: str, help: str = "", **labels: str) -> Gauge:
+        family = self._family(self._gauges, name, help)
+        key = _label_key(labels)
+        metric = family.get(key)
+        if metric is None:
+            with self._lock:
+                metric = family.setdefault(key, Gauge())
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        help: str = "",
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+        **labels: str,
+    ) -> Histogram:
+        family = self._family(self._histograms, name, help)
+        key = _label_key(labels)
+        metric = family.get(key)
+        if metric is None:
+            with self._lock:
+                metric = family.setdefault(key, Histogram(buckets))
+        return metric
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "counters": {
+                name: {_label_str(key): metric.value for key, metric in family.items()}
+                for name, family in self._counters.items()
+            },
+            "gauges": {
+                name: {_label_str(key): metric.value for key, metric in family.items()}
+                for name, family in self._gauges.items()
+            },
+            "histograms": {
+                name: {
+                    _label_str(key): {"count": metric.count, "sum": metric.sum}
+                    for key, metric in family.items()
+                }
+                for name, family in self._histograms.items()
+            },
+        }
+
+    def render_prometheus(self) -> str:
+        lines: list[str] = []
+
+        for name, family in sorted(self._counters.items()):
+            self._header(lines, name, "counter")
+            for key, metric in family.items():
+                lines.append(f"{name}{_label_str(key)} {metric.value:g}")
+
+        for name, family in sorted(self._gauges.items()):
+            self._header(lines, name, "gauge")
+            for key, metric in family.items():
+                lines.append(f"{name}{_label_str(key)} {metric.value:g}")
+
+        for name, family in sorted(self._histograms.items()):
+            self._header(lines, name, "histogram")
+            for key, metric in family.items():
+                cumulative = 0
+                for bound, count in zip((*metric.buckets, "+Inf"), metric.counts):
+                    cumulative += count
+                    le = bound if isinstance(bound, str) else f"{bound:g}"
+                    lines.append(f"{name}_bucket{_label_str(key, le=le)} {cumulative}")
+                lines.append(f"{name}_sum{_label_str(key)} {metric.sum:g}")
+                lines.append(f"{name}_count{_label_str(key)} {metric.count}")
+
+        return "\n".join(lines) + "\n"
+
+    def _family(self, families: dict[str, dict], name: str, help: str) -> dict:
+        family = families.get(name)
+        if family is None:
+            with self._lock:
+                family = families.setdefault(name, {})
+                if help:
+                    self._help.setdefault(name, help)
+        return family
+
+    def _header(self, lines: list[str], name: str, kind: str) -> None:
+        if name in self._help:
+            lines.append(f"# HELP {name} {self._help[name]}")
+        lines.append(f"# TYPE {name} {kind}")
+
+
+def _label_key(labels: dict[str, str]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _label_str(key: LabelKey, **extra: str) -> str:
+    pairs = [*key, *extra.items()]
+    if not pairs:
+        return ""
+    body = ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+    return "{" + body + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_registry: MetricsRegistry | None = None
+
+
+def get_registry() -> MetricsRegistry:
+    global _registry
+    if _registry is None:
+        _registry = MetricsRegistry()
+    return _registry
@@ -0,0 +1,126 @@
+from __future__ import annotations
+import json
+import os
+import statistics
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any
+from metrics.registry import MetricsRegistry, RATE_BUCKETS
+from metrics.tracing import Span
+
+LABEL_KEYS = ("model", "status")
+
+
+class MetricsSink(ABC):
+    @abstractmethod
+    def record(self, span: Span) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class RegistrySink(MetricsSink):
+    """Folds spans into registry metrics named after the span (`llm.request` -> `llm_request_*`)."""
+
+    def __init__(self, registry: MetricsRegistry) -> None:
+        self.registry = registry
+
+    def record(self, span: Span) -> None:
+        prefix = span.name.replace(".", "_")
+        labels = {
+            key: str(span.attributes[key])
+            for key in LABEL_KEYS
+            if key in span.attributes
+        }
+
+        self.registry.counter(f"{prefix}_total", f"Completed {span.name} spans", **labels).inc()
+
+        for key, value in span.attributes.items():
+            if key in LABEL_KEYS or isinstance(value, (bool, str)):
+                continue
+
+            if key.endswith("_seconds"):
+                histogram = self.registry.histogram(f"{prefix}_{key}", **labels)
+                if isinstance(value, list):
+                    for item in value:
+                        histogram.observe(item)
+                else:
+                    histogram.observe(value)
+            elif key.endswith("_per_second"):
+                self.registry.histogram(f"{prefix}_{key}", buckets=RATE_BUCKETS, **labels).observe(value)
+            elif isinstance(value, int):
+                self.registry.counter(f"{prefix}_{key}_total", **labels).inc(value)
+
+
+class PrometheusFileSink(MetricsSink):
+    """Rewrites a Prometheus text-format file (for node_exporter's textfile collector).
+
+    Writes are throttled to one per `interval` seconds and always atomic.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        registry: MetricsRegistry,
+        interval: float = 5.0,
+    ) -> None:
+        self.path = Path(path)
+        self.registry = registry
+        self.interval = interval
+        self._last_write = 0.0
+
+    def record(self, span: Span) -> None:
+        now = time.monotonic()
+        if now - self._last_write >= self.interval:
+            self._last_write = now
+            self.write()
+
+    def write(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_text(self.registry.render_prometheus(), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def close(self) -> None:
+        self.write()
+
+
+class JsonSpanSink(MetricsSink):
+    """Appends one JSON object per span; per-token lists are summarized, not dumped."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._file = None
+
+    def record(self, span: Span) -> None:
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = self.path.open("a", encoding="utf-8")
+
+        record = span.to_dict()
+        record["attributes"] = {
+            key: _summarize(value) if isinstance(value, list) else value
+            for key, value in span.attributes.items()
+        }
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _summarize(values: list[float]) -> dict[str, Any]:
+    if len(values) < 2:
+        return {"count": len(values), "max": max(values, default=None)}
+    quantiles = statistics.quantiles(values, n=100, method="inclusive")
+    return {
+        "count": len(values),
+        "p50": quantiles[49],
+        "p95": quantiles[94],
+        "p99": quantiles[98],
+        "max": max(values),
+    }
@@ -0,0 +1,158 @@
+from __future__ import annotations
+import time
+from dataclasses import dataclass, field
+from typing import Any, TYPE_CHECKING
+from config import config
+
+if TYPE_CHECKING:
+    from client.response import StreamEvent, TokenUsage
+    from metrics.sinks import MetricsSink
+
+
+@dataclass
+class Span:
+    """One timed operation. Attribute conventions the sinks rely on:
+
+    - `model`, `status`: become metric labels
+    - `*_seconds` (float or list of floats): latency histograms
+    - `*_per_second`: rate histograms
+    - other ints: counters
+    """
+
+    name: str
+    started_at: float = field(default_factory=time.time)
+    duration: float = 0.0
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "attributes": self.attributes,
+        }
+
+
+class RequestTrace:
+    """Timing for one LLM request, fed each stream event as it is yielded."""
+
+    __slots__ = (
+        "model", "endpoint", "stream", "session_id", "retries", "cached",
+        "rate_limit_wait",
+        "_started_at", "_start", "_last", "_ttft", "_gaps",
+        "_usage", "_finish_reason", "_error",
+    )
+
+    def __init__(
+        self,
+        model: str | None,
+        stream: bool,
+        session_id: str | None = None,
+    ) -> None:
+        self.model = model
+        self.stream = stream
+        self.session_id = session_id
+        self.endpoint: str | None = None
+        self.retries = 0
+        self.cached = False
+        # Seconds spent queued by the client-side rate limiter
+        self.rate_limit_wait = 0.0
+        self._started_at = time.time()
+        self._start = time.perf_counter()
+        self._last: float | None = None
+        self._ttft: float | None = None
+        self._gaps: list[float] = []
+        self._usage: TokenUsage | None = None
+        self._finish_reason: str | None = None
+        self._error: str | None = None
+
+    def observe(self, event: StreamEvent) -> None:
+        if event.text_delta is not None and event.text_delta.content:
+            now = time.perf_counter()
+            if self._last is None:
+                self._ttft = now - self._start
+            else:
+                self._gaps.append(now - self._last)
+            self._last = now
+
+        if event.usage is not None:
+            self._usage = event.usage
+        if event.finish_reason is not None:
+            self._finish_reason = event.finish_reason
+        if event.error is not None:
+            self._error = event.error
+
+    def finish(self) -> Span:
+        duration = time.perf_counter() - self._start
+        attributes: dict[str, Any] = {
+            "model": self.model or "unknown",
+            "status": "error" if self._error else "ok",
+            "stream": self.stream,
+            "cached": self.cached,
+            "retries": self.retries,
+            "duration_seconds": duration,
+        }
+        if self.session_id:
+            attributes["session_id"] = self.session_id
+        if self.endpoint:
+            attributes["endpoint"] = self.endpoint
+        if self.rate_limit_wait:
+            attributes["rate_limit_wait_seconds"] = self.rate_limit_wait
+        if self._ttft is not None:
+            attributes["ttft_seconds"] = self._ttft
+        if self._gaps:
+            attributes["inter_token_seconds"] = self._gaps
+        if self._finish_reason:
+            attributes["finish_reason"] = self._finish_reason
+        if self._error:
+            attributes["error"] = self._error
+
+        usage = self._usage
+        if usage is not None:
+            attributes["prompt_tokens"] = usage.prompt_tokens
+            attributes["completion_tokens"] = usage.completion_tokens
+            attributes["cached_tokens"] = usage.cached_tokens
+            if usage.completion_tokens and duration > 0:
+                generation = duration - (self._ttft or 0.0)
+                attributes["tokens_per_second"] = usage.completion_tokens / (generation or duration)
+
+        return Span("llm.request", self._started_at, duration, attributes)
+
+
+class Tracer:
+    def __init__(self, sinks: list[MetricsSink] | None = None) -> None:
+        self.sinks: list[MetricsSink] = list(sinks or [])
+
+    def add_sink(self, sink: MetricsSink) -> None:
+        self.sinks.append(sink)
+
+    def emit(self, span: Span) -> None:
+        for sink in self.sinks:
+            try:
+                sink.record(span)
+            except Exception:
+                # Telemetry must never break the request it describes
+                pass
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
+
+
+_tracer: Tracer | None = None
+
+
+def get_tracer() -> Tracer:
+    global _tracer
+    if _tracer is None:
+        from metrics.registry import get_registry
+        from metrics.sinks import JsonSpanSink, PrometheusFileSink, RegistrySink
+
+        registry = get_registry()
+        sinks: list[MetricsSink] = [RegistrySink(registry)]
+        if config.METRICS_PROMETHEUS_PATH:
+            sinks.append(PrometheusFileSink(config.METRICS_PROMETHEUS_PATH, registry))
+        if config.METRICS_SPAN_LOG_PATH:
+            sinks.append(JsonSpanSink(config.METRICS_SPAN_LOG_PATH))
+        _tracer = Tracer(sinks)
+    return _tracer
@@ -1,19 +1,110 @@
-def get_system_prompt() -> str:
-    parts = []
-
-    # Identity and role
-    parts.append(_get_identity_section())
-
-    # AGENTS.md spec
-    parts.append(_get_agents_md_section())
-
-    # Security guidelines
-    parts.append(_get_security_section())
-
-    # Operational guidelines
-    parts.append(_get_operational_section())
-
-    return "\n\n".join(parts)
+from __future__ import annotations
+from pathlib import Path
+
+AGENTS_MD_FILENAME = "AGENTS.md"
+
+
+class SystemPromptBuilder:
+    def __init__(self, cwd: Path | None = None) -> None:
+        self._cwd = (cwd or Path.cwd()).resolve()
+        self._candidates: list[Path] | None = None
+        self._static_sections: list[str] | None = None
+        self._agents_md: dict[Path, tuple[int, str]] = {}
+        self._fingerprint: tuple[tuple[Path, int], ...] | None = None
+        self._prompt: str | None = None
+
+    def build(self) -> str:
+        fingerprint = self._get_fingerprint()
+        if self._prompt is not None and fingerprint == self._fingerprint:
+            return self._prompt
+
+        if self._static_sections is None:
+            self._static_sections = [
+                # Identity and role
+                _get_identity_section(),
+                # AGENTS.md spec
+                _get_agents_md_section(),
+                # Security guidelines
+                _get_security_section(),
+                # Operational guidelines
+                _get_operational_section(),
+            ]
+
+        parts = list(self._static_sections)
+
+        # Loaded AGENTS.md instructions
+        instructions = self._get_instructions_section(fingerprint)
+        if instructions:
+            parts.insert(2, instructions)
+
+        self._fingerprint = fingerprint
+        self._prompt = "\n\n".join(parts)
+        return self._prompt
+
+    def _discover(self) -> list[Path]:
+        """Candidate AGENTS.md paths from the workspace root down to the CWD."""
+        if self._candidates is None:
+            directories = [self._cwd, *self._cwd.parents]
+            for index, directory in enumerate(directories):
+                if (directory / ".git").exists():
+                    directories = directories[: index + 1]
+                    break
+            else:
+                directories = [self._cwd]
+
+            self._candidates = [
+                directory / AGENTS_MD_FILENAME for directory in reversed(directories)
+            ]
+        return self._candidates
+
+    def _get_fingerprint(self) -> tuple[tuple[Path, int], ...]:
+        fingerprint = []
+        for path in self._discover():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            fingerprint.append((path, stat.st_mtime_ns))
+        return tuple(fingerprint)
+
+    def _read(self, path: Path, mtime_ns: int) -> str:
+        cached = self._agents_md.get(path)
+        if cached and cached[0] == mtime_ns:
+            return cached[1]
+
+        try:
+            content = path.read_text(encoding="utf-8", errors="replace").strip()
+        except OSError:
+            content = ""
+        self._agents_md[path] = (mtime_ns, content)
+        return content
+
+    def _get_instructions_section(
+        self, fingerprint: tuple[tuple[Path, int], ...]
+    ) -> str | None:
+        """Generate the loaded AGENTS.md instructions section."""
+        blocks = []
+        for path, mtime_ns in fingerprint:
+            content = self._read(path, mtime_ns)
+            if content:
+                blocks.append(f"## {path}\n\n{content}")
+
+        if not blocks:
+            return None
+
+        return "# AGENTS.md Instructions\n\n" + "\n\n".join(blocks)
+
+
+_builders: dict[Path, SystemPromptBuilder] = {}
+
+
+def get_system_prompt(cwd: Path | None = None) -> str:
+    cwd = (cwd or Path.cwd()).resolve()
+    builder = _builders.get(cwd)
+    if builder is None:
+        builder = _builders[cwd] = SystemPromptBuilder(cwd)
+
+    return builder.build()
 
 
 def _get_identity_section() -> str:
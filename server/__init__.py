@@ -0,0 +1,3 @@
+from .app import AgentServer, serve
+from .protocol import encode_event
+from .sessions import HostedSession, SessionManager
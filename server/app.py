@@ -0,0 +1,195 @@
+from __future__ import annotations
+import asyncio
+import json
+import time
+from contextlib import aclosing
+from typing import TYPE_CHECKING
+from client.stream import RunLimits
+from config import config
+from metrics import get_registry
+from server.protocol import encode_event, error_frame, session_frame
+from server.sessions import HostedSession, SessionManager
+from utils import get_encoding
+
+if TYPE_CHECKING:
+    from websockets.asyncio.server import ServerConnection
+
+SESSION_PATH_PREFIX = "/sessions/"
+
+
+class AgentServer:
+    """Hosts many agent sessions in one process over WebSocket.
+
+    Connect to `/` for a new session or `/sessions/<id>` to continue one; the
+    first frame names the session. Each turn's AgentEvents are streamed back
+    as compact JSON frames (see server.protocol). Sending a frame waits for
+    the socket to drain, so a slow client slows its own LLM stream down
+    rather than piling up events in memory.
+    """
+
+    def __init__(
+        self,
+        host: str | None = None,
+        port: int | None = None,
+        sessions: SessionManager | None = None,
+        limits: RunLimits | None = None,
+    ) -> None:
+        self.host = host or config.SERVER_HOST
+        self.port = config.SERVER_PORT if port is None else port
+        self._sessions = sessions
+        self._limits = limits
+        self._server = None
+        self._sweeper: asyncio.Task | None = None
+        self._connections = get_registry().gauge("server_connections", "Open WebSocket connections")
+
+    @property
+    def sessions(self) -> SessionManager:
+        if self._sessions is None:
+            from client.llm_client import LLMClient
+
+            self._sessions = SessionManager(LLMClient(), limits=self._limits)
+        return self._sessions
+
+    async def start(self) -> AgentServer:
+        from websockets.asyncio.server import serve
+
+        # Deltas are a few bytes each: deflating every frame costs more CPU than it saves
+        self._server = await serve(self._handle, self.host, self.port, compression=None)
+        if not self.port:
+            self.port = self._server.sockets[0].getsockname()[1]
+
+        # The tokenizer registry is process-wide: load it once, before the first session needs it
+        await asyncio.gather(
+            asyncio.to_thread(get_encoding, config.DEFAULT_AI_MODEL),
+            self.sessions.client.warm_up(),
+        )
+        self._sweeper = asyncio.create_task(self._sweep())
+        return self
+
+    async def serve_forever(self) -> None:
+        await self._server.serve_forever()
+
+    async def stop(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._sessions is not None:
+            await self._sessions.close()
+            await self._sessions.client.close()
+
+    async def __aenter__(self) -> AgentServer:
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.stop()
+
+    async def _sweep(self) -> None:
+        interval = max(1.0, min(self.sessions.idle_timeout / 4, 30.0))
+        while True:
+            await asyncio.sleep(interval)
+            await self.sessions.enforce()
+
+    async def _handle(self, websocket: ServerConnection) -> None:
+        from websockets.exceptions import ConnectionClosed
+
+        path = websocket.request.path if websocket.request else "/"
+        session_id = None
+        if path.startswith(SESSION_PATH_PREFIX):
+            session_id = path[len(SESSION_PATH_PREFIX):].strip("/") or None
+
+        try:
+            hosted = self.sessions.attach(session_id)
+        except FileNotFoundError as e:
+            await websocket.send(error_frame(str(e)))
+            await websocket.close(1008, "unknown session")
+            return
+
+        self._connections.inc()
+        turn: asyncio.Task | None = None
+        try:
+            await websocket.send(session_frame(hosted.id))
+            async for raw in websocket:
+                try:
+                    request = json.loads(raw)
+                    kind = request["t"]
+                except (ValueError, KeyError, TypeError):
+                    await websocket.send(error_frame("Expected a JSON object with a 't' field"))
+                    continue
+
+                if kind == "message":
+                    if hosted.busy:
+                        await websocket.send(error_frame("A turn is already running in this session"))
+                        continue
+                    hosted.busy = True
+                    turn = asyncio.create_task(
+                        self._run_turn(websocket, hosted, str(request.get("c") or ""))
+                    )
+                elif kind == "cancel" and hosted.busy:
+                    # Also covers a turn whose run hasn't started yet
+                    hosted.cancel_pending = True
+                    if hosted.agent is not None:
+                        hosted.agent.cancel()
+                elif kind != "cancel":
+                    await websocket.send(error_frame(f"Unknown frame type '{kind}'"))
+        except ConnectionClosed:
+            pass
+        finally:
+            if turn is not None and not turn.done():
+                # The client is gone: closing the run closes its LLM request
+                turn.cancel()
+                try:
+                    await turn
+                except asyncio.CancelledError:
+                    pass
+            self._connections.dec()
+            self.sessions.detach(hosted)
+
+    async def _run_turn(self, websocket: ServerConnection, hosted: HostedSession, message: str) -> None:
+        from websockets.exceptions import ConnectionClosed
+
+        try:
+            agent = self.sessions.activate(hosted)
+            started = False
+            async with aclosing(agent.run(message)) as events:
+                async for event in events:
+                    if not started:
+                        # The run can be cancelled from its first event on
+                        started = True
+                        if hosted.cancel_pending:
+                            agent.cancel()
+                    await websocket.send(encode_event(event))
+        except ConnectionClosed:
+            pass
+        except Exception as e:
+            # Keep the connection (and other sessions) alive; report the failure to this client
+            try:
+                await websocket.send(error_frame(f"{type(e).__name__}: {e}"))
+            except ConnectionClosed:
+                pass
+        finally:
+            hosted.busy = False
+            hosted.cancel_pending = False
+            hosted.last_active = time.monotonic()
+            await self.sessions.enforce()
+
+
+async def serve(
+    host: str | None = None,
+    port: int | None = None,
+    limits: RunLimits | None = None,
+) -> None:
+    from client import get_client_pool
+    from metrics import get_tracer
+
+    server = AgentServer(host, port, limits=limits)
+    try:
+        async with server:
+            print(f"listening on ws://{server.host}:{server.port}", flush=True)
+            await server.serve_forever()
+    finally:
+        await get_client_pool().aclose()
+        get_tracer().close()
@@ -0,0 +1,46 @@
+from __future__ import annotations
+import json
+from typing import Any
+from agent import AgentEvent, AgentEventType
+
+# Text deltas are most of the traffic, so they get the shortest frame:
+#   {"t":"d","c":"<text>"}
+# Everything else is {"t":"<agent event type>", ...} with short keys:
+#   agent_start     {}
+#   text_complete   {}  (the text is the deltas already sent)
+#   agent_error     {"e": error}
+#   agent_end       {"f": finish_reason, "u": [prompt, completion, total, cached]}
+# plus the server's own frames:
+#   session         {"id": session_id}
+#   error           {"e": message}
+#
+# Clients send {"t":"message","c":"<text>"} to start a turn and {"t":"cancel"}
+# to stop the one in progress.
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def encode_event(event: AgentEvent) -> str:
+    kind = event.type
+    if kind == AgentEventType.TEXT_DELTA:
+        return _encoder.encode({"t": "d", "c": event.content})
+
+    frame: dict[str, Any] = {"t": kind.value}
+    if kind == AgentEventType.AGENT_ERROR:
+        frame["e"] = event.error
+    elif kind == AgentEventType.AGENT_END:
+        frame["f"] = event.finish_reason
+        usage = event.usage
+        frame["u"] = (
+            [usage.prompt_tokens, usage.completion_tokens, usage.total_tokens, usage.cached_tokens]
+            if usage else None
+        )
+    return _encoder.encode(frame)
+
+
+def session_frame(session_id: str) -> str:
+    return _encoder.encode({"t": "session", "id": session_id})
+
+
+def error_frame(message: str) -> str:
+    return _encoder.encode({"t": "error", "e": message})
@@ -0,0 +1,138 @@
+from __future__ import annotations
+import re
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+from agent import Agent
+from client.stream import RunLimits
+from config import config
+from context import Session, SessionStore
+from metrics import get_registry
+
+if TYPE_CHECKING:
+    from client.llm_client import LLMClient
+
+SESSION_ID_PATTERN = re.compile(r"[0-9a-f]{12}")
+
+
+@dataclass
+class HostedSession:
+    session: Session
+    # None while evicted; rebuilt from the session log on the next turn
+    agent: Agent | None = None
+    last_active: float = field(default_factory=time.monotonic)
+    busy: bool = False
+    # A cancel that arrived before the turn's run had started
+    cancel_pending: bool = False
+    connections: int = 0
+
+    @property
+    def id(self) -> str:
+        return self.session.id
+
+    @property
+    def resident_tokens(self) -> int:
+        return self.agent.context_manager.total_tokens if self.agent is not None else 0
+
+
+class SessionManager:
+    """The agent sessions a server hosts, all sharing one LLMClient.
+
+    A session's Agent (and with it the ContextManager) is only kept in memory
+    while it is in use. Sessions idle for longer than `idle_timeout`, and the
+    least recently used ones whenever the resident contexts together exceed
+    `max_resident_tokens`, are evicted: their history is already on disk in
+    the session log, so the next turn rebuilds the context from there.
+    """
+
+    def __init__(
+        self,
+        client: LLMClient,
+        store: SessionStore | None = None,
+        max_resident_tokens: int | None = None,
+        idle_timeout: float | None = None,
+        limits: RunLimits | None = None,
+    ) -> None:
+        self.client = client
+        self.limits = limits
+        self.store = store or SessionStore()
+        self.max_resident_tokens = max_resident_tokens or config.SERVER_MAX_RESIDENT_TOKENS
+        self.idle_timeout = idle_timeout or config.SERVER_IDLE_TIMEOUT
+        self._sessions: dict[str, HostedSession] = {}
+
+        registry = get_registry()
+        self._resident = registry.gauge("server_sessions_resident", "Sessions with their context in memory")
+        self._resident_tokens = registry.gauge("server_resident_tokens", "Tokens held by resident contexts")
+        self._evictions = registry.counter("server_evictions_total", "Session contexts evicted to disk")
+        self._loads = registry.counter("server_session_loads_total", "Session contexts rebuilt from disk")
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def attach(self, session_id: str | None = None) -> HostedSession:
+        """A connection joins a new session, or an existing one by id."""
+        if session_id is None:
+            hosted = HostedSession(self.store.create())
+            self._sessions[hosted.id] = hosted
+        else:
+            if not SESSION_ID_PATTERN.fullmatch(session_id):
+                raise FileNotFoundError(f"Invalid session id '{session_id}'")
+            hosted = self._sessions.get(session_id)
+            if hosted is None:
+                hosted = HostedSession(self.store.open(session_id))
+                self._sessions[session_id] = hosted
+
+        hosted.connections += 1
+        hosted.last_active = time.monotonic()
+        return hosted
+
+    def detach(self, hosted: HostedSession) -> None:
+        hosted.connections -= 1
+        hosted.last_active = time.monotonic()
+
+    def activate(self, hosted: HostedSession) -> Agent:
+        """The session's agent, loading its context from disk if it was evicted."""
+        hosted.last_active = time.monotonic()
+        if hosted.agent is None:
+            hosted.agent = Agent(hosted.session, self.limits, self.client)
+            self._loads.inc()
+            self._update_gauges()
+        return hosted.agent
+
+    async def evict(self, hosted: HostedSession) -> None:
+        agent, hosted.agent = hosted.agent, None
+        if agent is not None:
+            await agent.close()
+            self._evictions.inc()
+
+        if hosted.connections <= 0:
+            # Nobody can send to it; a reconnect re-attaches by id
+            self._sessions.pop(hosted.id, None)
+        self._update_gauges()
+
+    async def enforce(self) -> None:
+        """Evict idle sessions, then least recently used ones until under the token budget."""
+        now = time.monotonic()
+        idle = [hosted for hosted in self._sessions.values() if not hosted.busy]
+        idle.sort(key=lambda hosted: hosted.last_active)
+
+        resident = sum(hosted.resident_tokens for hosted in self._sessions.values())
+        for hosted in idle:
+            expired = now - hosted.last_active >= self.idle_timeout
+            if not expired and resident <= self.max_resident_tokens:
+                break
+            resident -= hosted.resident_tokens
+            if hosted.agent is not None or hosted.connections <= 0:
+                await self.evict(hosted)
+
+        self._update_gauges()
+
+    async def close(self) -> None:
+        for hosted in list(self._sessions.values()):
+            hosted.connections = 0
+            await self.evict(hosted)
+
+    def _update_gauges(self) -> None:
+        resident = [hosted for hosted in self._sessions.values() if hosted.agent is not None]
+        self._resident.set(len(resident))
+        self._resident_tokens.set(sum(hosted.resident_tokens for hosted in resident))
@@ -0,0 +1,5 @@
+from .base import Tool, ToolKind, ToolResult, ToolInvocation, ToolConfirmation
+from .cache import ToolResultCache, get_tool_cache
+from .executor import ToolCall, ToolExecutor
+from .output import ToolOutputBuffer, read_tool_output, truncate_result
+from .registry import ToolRegistry
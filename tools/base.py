@@ -1,12 +1,17 @@
+from __future__ import annotations
+import os
 from pydantic.json_schema import model_json_schema
 from pathlib import Path
-from __future__ import annotations
+from functools import lru_cache
 from typing import Any
 from abc import ABC, abstractmethod
 from pydantic import BaseModel, ValidationError
 from enum import Enum
 from dataclasses import dataclass, field
 
+# Parameters that name the files or directories a call reads or writes
+PATH_PARAMS = ("path", "paths", "file_path", "file_paths", "directory", "dir")
+
 class ToolKind(str, Enum):
     READ = "read"
     WRITE = "write"
@@ -21,6 +26,22 @@ class ToolResult:
     output: str
     error: str | None = None
     metadata: dict[str, Any] = field(default_factory=dict)
+    # Path of the full output when `output` is a truncated excerpt
+    output_ref: str | None = None
+
+    @classmethod
+    def error_result(
+        cls,
+        error: str,
+        output: str = "",
+        metadata: dict[str, Any] | None = None,
+    ) -> ToolResult:
+        return cls(
+            success=False,
+            output=output,
+            error=error,
+            metadata=metadata or {},
+        )
 
 @dataclass
 class ToolConfirmation:
@@ -37,6 +58,10 @@ class Tool(ABC):
     name: str = "base_tool"
     description: str = "Base tool"
     kind: ToolKind = ToolKind.READ
+    # Seconds before the executor abandons a call; None uses the executor default
+    timeout: float | None = None
+    # Whether the executor may reuse a read-only call's result (see tools.cache)
+    cacheable: bool = True
 
     def __init__(self) -> None:
         pass
@@ -53,7 +78,8 @@ class Tool(ABC):
         schema = self.schema
         if isinstance(schema, type) and issubclass(schema, BaseModel):
             try: 
-                BaseModel(**params)
+                # The model's validator is compiled once by pydantic at class creation
+                schema.model_validate(params)
             except ValidationError as e:
                 errors = []
                 for error in e.errors():
@@ -76,6 +102,23 @@ class Tool(ABC):
             ToolKind.MEMORY,
         }
 
+    def get_paths(self, invocation: ToolInvocation) -> list[str]:
+        """Absolute paths of the files and directories the call reads or writes.
+
+        Taken from the PATH_PARAMS parameters; tools that find their files
+        some other way override this. An empty list means the whole of
+        `invocation.cwd` may be involved. Read-only results are only cached
+        when these are all regular files (see tools.cache).
+        """
+        paths = []
+        for name in PATH_PARAMS:
+            value = invocation.params.get(name)
+            values = value if isinstance(value, (list, tuple)) else [value]
+            for item in values:
+                if isinstance(item, str) and item:
+                    paths.append(os.path.normpath(os.path.join(invocation.cwd, os.path.expanduser(item))))
+        return paths
+
     async def get_confirmation(self, invocation: ToolInvocation) -> ToolInvocation | None:
         if not self.is_mutating(invocation.params):
             return None
@@ -87,18 +130,29 @@ class Tool(ABC):
         )
 
     def to_openai_schema(self) -> dict[str, Any]:
+        # Built once per tool instance; the schema doesn't change between requests
+        cached = self.__dict__.get("_openai_schema")
+        if cached is None:
+            cached = self.__dict__["_openai_schema"] = self._build_openai_schema()
+        return cached
+
+    def _build_openai_schema(self) -> dict[str, Any]:
         schema = self.schema
         if isinstance(schema, type) and issubclass(schema, BaseModel):
-            json_schema = model_json_schema(schema, mode="serialization")
+            json_schema = _model_json_schema(schema)
+
+            parameters = {
+                "type": 'object',
+                "properties": json_schema.get("properties", {}),
+                "required": json_schema.get("required", []),
+            }
+            if "$defs" in json_schema:
+                parameters["$defs"] = json_schema["$defs"]
 
             return {
                 "name": self.name,
                 "description": self.description,
-                "parameters": {
-                    "type": 'object',
-                    "properties": json_schema.get("properties", {}),
-                    "required": json_schema.get("requried", [])
-                }
+                "parameters": parameters,
             }
         
         if isinstance(schema, dict):
@@ -107,11 +161,16 @@ class Tool(ABC):
                 "description": self.description
             }
 
-            if "paramters" in schema:
+            if "parameters" in schema:
                 result["parameters"] = schema["parameters"]
             else:
                 result["parameters"] = schema
             
             return result
 
-        raise ValueError(f'Invalid schema type for tool {self.name}" {type(schema)}')
\ No newline at end of file
+        raise ValueError(f'Invalid schema type for tool {self.name}" {type(schema)}')
+
+
+@lru_cache(maxsize=None)
+def _model_json_schema(model: type[BaseModel]) -> dict[str, Any]:
+    return model_json_schema(model, mode="validation")
@@ -0,0 +1,199 @@
+from __future__ import annotations
+import json
+import os
+import stat
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Any
+from config import config
+from metrics import get_registry
+from tools.base import ToolResult
+
+# (tool name, canonical params, cwd, output token cap)
+CacheKey = tuple[str, str, str, int | None]
+# (mtime_ns, size) of a regular file
+Fingerprint = tuple[int, int]
+
+
+def fingerprint(path: str) -> Fingerprint | None:
+    """The file's fingerprint; None if it is missing or not a regular file.
+
+    A directory's mtime and size don't change when a file inside it is
+    edited, so directories can't vouch for what was read under them.
+    """
+    try:
+        info = os.stat(path)
+    except OSError:
+        return None
+    if not stat.S_ISREG(info.st_mode):
+        return None
+    return info.st_mtime_ns, info.st_size
+
+
+def _overlaps(path: str, other: str) -> bool:
+    # Equal, or one contains the other: writing a file also changes its directory's listing
+    if path == other:
+        return True
+    shorter, longer = (path, other) if len(path) < len(other) else (other, path)
+    return longer.startswith(shorter.rstrip(os.sep) + os.sep)
+
+
+@dataclass
+class CachedToolResult:
+    result: ToolResult
+    cwd: str
+    paths: tuple[str, ...]
+    fingerprints: tuple[Fingerprint, ...]
+    size: int
+
+
+class ToolResultCache:
+    """In-memory LRU cache of read-only tool results, bounded by bytes.
+
+    An entry is keyed by tool name, canonical params and cwd, and remembers
+    the mtime/size of the files the call read (see Tool.get_paths) as they
+    were before it ran. Each lookup compares them with the files' current
+    fingerprints, so edits made outside the agent are noticed too, except
+    one that keeps the size within the file system's mtime resolution.
+    Mutating calls also invalidate the entries they may have affected
+    directly.
+
+    Only calls whose paths are all regular files are cached: searches over
+    a directory, or calls naming no paths, always run, since nothing cheap
+    tells whether some file under the directory changed.
+    """
+
+    def __init__(self, max_bytes: int | None = None) -> None:
+        self.max_bytes = max_bytes or config.TOOL_CACHE_MAX_BYTES
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[CacheKey, CachedToolResult] = OrderedDict()
+        self._total_bytes = 0
+
+        registry = get_registry()
+        self._hit_counter = registry.counter("tool_cache_hits_total", "Tool calls answered from the cache")
+        self._miss_counter = registry.counter("tool_cache_misses_total", "Cacheable tool calls that ran")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    @staticmethod
+    def make_key(
+        name: str,
+        params: dict[str, Any],
+        cwd: str,
+        max_output_tokens: int | None = None,
+    ) -> CacheKey:
+        canonical = json.dumps(params, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+        return name, canonical, cwd, max_output_tokens
+
+    @staticmethod
+    def fingerprint_files(paths: list[str]) -> tuple[Fingerprint, ...] | None:
+        """Fingerprints of `paths`; None unless they are all regular files."""
+        if not paths:
+            return None
+        fingerprints = []
+        for path in paths:
+            current = fingerprint(path)
+            if current is None:
+                return None
+            fingerprints.append(current)
+        return tuple(fingerprints)
+
+    def get(self, key: CacheKey, fingerprints: tuple[Fingerprint, ...]) -> ToolResult | None:
+        """The cached result, if it was made from files with these fingerprints."""
+        entry = self._entries.get(key)
+        if entry is not None and entry.fingerprints != fingerprints:
+            self._delete(key)
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            self._miss_counter.inc()
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        self._hit_counter.inc()
+        return self._annotate(entry.result, hit=True)
+
+    def put(
+        self,
+        key: CacheKey,
+        paths: list[str],
+        fingerprints: tuple[Fingerprint, ...],
+        result: ToolResult,
+    ) -> ToolResult:
+        """Store a result; `fingerprints` must be taken before the call ran."""
+        size = (
+            len(result.output.encode("utf-8"))
+            + len((result.error or "").encode("utf-8"))
+            + sum(len(path) for path in paths)
+            + len(key[1])
+        )
+        if size <= self.max_bytes:
+            self._delete(key)
+            self._entries[key] = CachedToolResult(
+                result=result,
+                cwd=key[2],
+                paths=tuple(paths),
+                fingerprints=fingerprints,
+                size=size,
+            )
+            self._total_bytes += size
+            self._evict()
+        return self._annotate(result, hit=False)
+
+    def invalidate(self, cwd: str, paths: list[str] | None = None) -> int:
+        """Drop entries that involve any of the absolute `paths`, whatever their cwd.
+
+        With no paths the call may have changed anything under `cwd`: entries
+        made there, or reading files under it, are dropped.
+        """
+        targets = paths or [cwd]
+        stale = [
+            key for key, entry in self._entries.items()
+            if (not paths and entry.cwd == cwd)
+            or any(_overlaps(path, other) for path in entry.paths for other in targets)
+        ]
+        for key in stale:
+            self._delete(key)
+        return len(stale)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._total_bytes = 0
+
+    def _annotate(self, result: ToolResult, hit: bool) -> ToolResult:
+        metadata = {
+            **result.metadata,
+            "cache": "hit" if hit else "miss",
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+        }
+        return replace(result, metadata=metadata)
+
+    def _delete(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry.size
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self._total_bytes -= entry.size
+
+
+_cache: ToolResultCache | None = None
+
+
+def get_tool_cache() -> ToolResultCache | None:
+    global _cache
+    if _cache is None and config.TOOL_CACHE_MAX_BYTES > 0:
+        _cache = ToolResultCache(config.TOOL_CACHE_MAX_BYTES)
+
+    return _cache
@@ -0,0 +1,164 @@
+from __future__ import annotations
+import asyncio
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+from tools.base import Tool, ToolInvocation, ToolResult
+from tools.cache import ToolResultCache, get_tool_cache
+from tools.output import truncate_result
+from tools.registry import ToolRegistry
+
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_TOOL_TIMEOUT = 120.0
+
+
+@dataclass
+class ToolCall:
+    call_id: str
+    name: str
+    params: dict[str, Any] = field(default_factory=dict)
+    # Why the model's arguments couldn't be used; the executor reports it as the call's result
+    error: str | None = None
+
+    @classmethod
+    def from_openai(cls, tool_call: dict[str, Any]) -> ToolCall:
+        function = tool_call.get("function") or {}
+        name = function.get("name", "")
+        arguments = function.get("arguments") or {}
+        error = None
+        if isinstance(arguments, str):
+            try:
+                arguments = json.loads(arguments) if arguments.strip() else {}
+            except ValueError as e:
+                error = f"Invalid JSON arguments for tool '{name}': {e}"
+        if error is None and not isinstance(arguments, dict):
+            error = f"Arguments for tool '{name}' must be a JSON object, got {type(arguments).__name__}"
+
+        return cls(
+            call_id=tool_call.get("id", ""),
+            name=name,
+            params=arguments if error is None else {},
+            error=error,
+        )
+
+
+class ToolExecutor:
+    """Runs one model turn's tool calls.
+
+    Consecutive read-only calls run concurrently (bounded by max_concurrency).
+    A mutating call acts as a barrier: it runs alone, after everything before
+    it and before everything after it, so reads never race a write they follow.
+    Results come back in call order, each carrying its call_id in metadata.
+    Each result's output is capped at max_output_tokens; the full text stays
+    readable through `output_ref`.
+
+    Read-only results are reused from the ToolResultCache while the files
+    they read are unchanged; a mutating call invalidates the entries for the
+    paths it names, or for the whole cwd when it names none.
+    """
+
+    def __init__(
+        self,
+        registry: ToolRegistry,
+        cwd: Path | None = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        default_timeout: float | None = DEFAULT_TOOL_TIMEOUT,
+        max_output_tokens: int | None = None,
+        cache: ToolResultCache | None = None,
+    ) -> None:
+        self.registry = registry
+        self.cwd = cwd or Path.cwd()
+        self.cache = cache if cache is not None else get_tool_cache()
+        self.default_timeout = default_timeout
+        self.max_output_tokens = max_output_tokens
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def execute_batch(self, calls: list[ToolCall]) -> list[ToolResult]:
+        results: list[ToolResult | None] = [None] * len(calls)
+        read_group: list[int] = []
+
+        async def run_read_group() -> None:
+            if not read_group:
+                return
+            group_results = await asyncio.gather(
+                *(self._execute_limited(calls[index]) for index in read_group)
+            )
+            for index, result in zip(read_group, group_results):
+                results[index] = result
+            read_group.clear()
+
+        for index, call in enumerate(calls):
+            tool = self.registry.get(call.name)
+            if tool is not None and not tool.is_mutating(call.params):
+                read_group.append(index)
+                continue
+
+            await run_read_group()
+            results[index] = await self.execute(call)
+
+        await run_read_group()
+        return results
+
+    async def execute(self, call: ToolCall) -> ToolResult:
+        result = await self._execute(call)
+        # Every result names its call; a fresh dict, since cached results share theirs
+        result.metadata = {**result.metadata, "call_id": call.call_id}
+        return result
+
+    async def _execute(self, call: ToolCall) -> ToolResult:
+        if call.error is not None:
+            return ToolResult.error_result(call.error)
+
+        tool = self.registry.get(call.name)
+        if tool is None:
+            return ToolResult.error_result(f"Unknown tool: {call.name}")
+
+        errors = tool.validate_params(call.params)
+        if errors:
+            return ToolResult.error_result("; ".join(errors))
+
+        invocation = ToolInvocation(cwd=self.cwd, params=call.params)
+        cache = self.cache
+        if cache is None:
+            return await self._run(tool, invocation)
+
+        cwd = str(self.cwd)
+        paths = tool.get_paths(invocation)
+        if tool.is_mutating(call.params):
+            try:
+                return await self._run(tool, invocation)
+            finally:
+                # Even a failed write may have changed something
+                cache.invalidate(cwd, paths)
+
+        # Taken before the call, so a change while it runs invalidates the entry
+        fingerprints = cache.fingerprint_files(paths) if tool.cacheable else None
+        if fingerprints is None:
+            return await self._run(tool, invocation)
+
+        key = cache.make_key(tool.name, call.params, cwd, self.max_output_tokens)
+        result = cache.get(key, fingerprints)
+        if result is not None:
+            return result
+
+        result = await self._run(tool, invocation)
+        if not result.success:
+            return result
+        return cache.put(key, paths, fingerprints, result)
+
+    async def _run(self, tool: Tool, invocation: ToolInvocation) -> ToolResult:
+        timeout = tool.timeout if tool.timeout is not None else self.default_timeout
+
+        try:
+            result = await asyncio.wait_for(tool.execute(invocation), timeout)
+        except asyncio.TimeoutError:
+            return ToolResult.error_result(f"Tool '{tool.name}' timed out after {timeout:g}s")
+        except Exception as e:
+            return ToolResult.error_result(f"Tool '{tool.name}' failed: {e}")
+
+        return truncate_result(result, self.max_output_tokens)
+
+    async def _execute_limited(self, call: ToolCall) -> ToolResult:
+        async with self._semaphore:
+            return await self.execute(call)
@@ -0,0 +1,250 @@
+from __future__ import annotations
+import atexit
+import codecs
+import os
+import tempfile
+from collections import deque
+from pathlib import Path
+from typing import Any, AsyncIterable
+from config import config
+from tools.base import ToolResult
+from utils import count_tokens
+
+READ_BLOCK_CHARS = 1024 * 1024
+
+_spill_files: set[str] = set()
+
+
+class ToolOutputBuffer:
+    """Collects tool output without holding all of it in memory.
+
+    Output stays in memory up to `memory_limit` characters. Past that, all of
+    it goes to a temp file and only a head and a tail (half the limit each)
+    are kept in memory for building the excerpt sent to the model.
+    """
+
+    def __init__(
+        self,
+        memory_limit: int | None = None,
+        spill_dir: str | Path | None = None,
+    ) -> None:
+        self.memory_limit = memory_limit or config.TOOL_OUTPUT_MEMORY_LIMIT
+        self.spill_dir = spill_dir or config.TOOL_OUTPUT_SPILL_DIR
+        self.total_chars = 0
+        self.path: str | None = None
+
+        self._chunks: list[str] = []
+        self._head = ""
+        # Last chunks written after spilling, trimmed from the left to about half the limit
+        self._tail: deque[str] = deque()
+        self._tail_chars = 0
+        self._file = None
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    @property
+    def spilled(self) -> bool:
+        return self.path is not None
+
+    def write(self, data: str | bytes) -> None:
+        text = self._decoder.decode(data) if isinstance(data, bytes) else data
+        if not text:
+            return
+
+        self.total_chars += len(text)
+
+        if self._file is None:
+            self._chunks.append(text)
+            if self.total_chars > self.memory_limit:
+                self._spill()
+            return
+
+        self._file.write(text)
+        self._keep_tail(text)
+
+    async def consume(self, stream: AsyncIterable[str | bytes]) -> ToolOutputBuffer:
+        async for data in stream:
+            self.write(data)
+        return self
+
+    def close(self) -> None:
+        remainder = self._decoder.decode(b"", final=True)
+        if remainder:
+            self.write(remainder)
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def to_result(
+        self,
+        success: bool = True,
+        error: str | None = None,
+        max_tokens: int | None = None,
+        model: str | None = None,
+        metadata: dict[str, Any] | None = None,
+    ) -> ToolResult:
+        """Finish the buffer and build a ToolResult carrying a token-budgeted excerpt."""
+        max_tokens = max_tokens or config.TOOL_OUTPUT_MAX_TOKENS
+        model = model or config.DEFAULT_AI_MODEL
+
+        # Flushes the decoder first, so a trailing partial UTF-8 sequence is part of the output
+        self.close()
+        if not self.spilled:
+            text = "".join(self._chunks)
+            if _fits(text, max_tokens, model):
+                return ToolResult(
+                    success=success,
+                    output=text,
+                    error=error,
+                    metadata=metadata or {},
+                )
+            # Truncating: persist the full output so it stays retrievable
+            self._spill()
+
+        self.close()
+        output = self._excerpt(max_tokens, model)
+
+        result_metadata = dict(metadata or {})
+        result_metadata.update(
+            truncated=True,
+            total_chars=self.total_chars,
+        )
+        return ToolResult(
+            success=success,
+            output=output,
+            error=error,
+            metadata=result_metadata,
+            output_ref=self.path,
+        )
+
+    def _spill(self) -> None:
+        text = "".join(self._chunks)
+        self._chunks = []
+
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+        self._file = tempfile.NamedTemporaryFile(
+            "w",
+            encoding="utf-8",
+            prefix="tool-output-",
+            suffix=".log",
+            dir=self.spill_dir,
+            delete=False,
+        )
+        self.path = self._file.name
+        _spill_files.add(self.path)
+        self._file.write(text)
+
+        self._head = text[:self.memory_limit // 2]
+        self._keep_tail(text)
+
+    def _keep_tail(self, text: str) -> None:
+        keep = self.memory_limit // 2
+        tail = self._tail
+        tail.append(text[-keep:])
+        self._tail_chars += len(tail[-1])
+        # Whole chunks only, so a write never copies the tail kept so far
+        while self._tail_chars - len(tail[0]) >= keep:
+            self._tail_chars -= len(tail.popleft())
+
+    def _excerpt(self, max_tokens: int, model: str | None) -> str:
+        head_budget = max(1, max_tokens // 2)
+        tail_budget = max(1, max_tokens - head_budget)
+
+        head = _fit_prefix(self._head, head_budget, model)
+        tail = _fit_suffix("".join(self._tail)[-(self.memory_limit // 2):], tail_budget, model)
+        omitted = self.total_chars - len(head) - len(tail)
+
+        return (
+            f"{head}\n\n"
+            f"[... {omitted} characters omitted of {self.total_chars} total. "
+            f"Full output: {self.path} (use a ranged read to see more) ...]\n\n"
+            f"{tail}"
+        )
+
+
+def read_tool_output(ref: str, offset: int = 0, length: int = READ_BLOCK_CHARS) -> str:
+    """Read `length` characters starting at character `offset` of a spilled tool output."""
+    with open(ref, encoding="utf-8", errors="replace") as f:
+        remaining = offset
+        while remaining > 0:
+            skipped = f.read(min(remaining, READ_BLOCK_CHARS))
+            if not skipped:
+                return ""
+            remaining -= len(skipped)
+        return f.read(length)
+
+
+def truncate_result(
+    result: ToolResult,
+    max_tokens: int | None = None,
+    model: str | None = None,
+) -> ToolResult:
+    """Apply the output budget to a result a tool built from an in-memory string."""
+    max_tokens = max_tokens or config.TOOL_OUTPUT_MAX_TOKENS
+    model = model or config.DEFAULT_AI_MODEL
+
+    if result.output_ref is not None or _fits(result.output, max_tokens, model):
+        return result
+
+    buffer = ToolOutputBuffer(memory_limit=max(len(result.output), 1))
+    buffer.write(result.output)
+    return buffer.to_result(
+        success=result.success,
+        error=result.error,
+        max_tokens=max_tokens,
+        model=model,
+        metadata=result.metadata,
+    )
+
+
+def _fits(text: str, max_tokens: int, model: str | None) -> bool:
+    # A token always covers at least one character, so short text can skip counting
+    if len(text) <= max_tokens:
+        return True
+    return count_tokens(text, model) <= max_tokens
+
+
+def _fit_prefix(text: str, max_tokens: int, model: str | None) -> str:
+    chars = min(len(text), max_tokens * 4)
+    for _ in range(6):
+        candidate = text[:chars]
+        tokens = count_tokens(candidate, model)
+        if tokens <= max_tokens:
+            return candidate
+        chars = int(chars * max_tokens / tokens * 0.95)
+    return text[:max_tokens]
+
+
+def _fit_suffix(text: str, max_tokens: int, model: str | None) -> str:
+    """The longest suffix of `text` (to within about 1.5%) that fits in `max_tokens`."""
+    if _fits(text, max_tokens, model):
+        return text
+
+    # Invariant: a suffix of `fits` chars is within budget, one of `over` chars isn't
+    fits, over = 0, len(text)
+    guess = min(over - 1, max_tokens * 4)
+    while guess > fits:
+        if _fits(text[-guess:], max_tokens, model):
+            fits = guess
+            guess = min(over - 1, guess * 2)
+        else:
+            over = guess
+            break
+
+    while over - fits > max(1, fits // 64):
+        middle = (fits + over) // 2
+        if _fits(text[-middle:], max_tokens, model):
+            fits = middle
+        else:
+            over = middle
+    return text[-fits:] if fits else ""
+
+
+@atexit.register
+def _remove_spill_files() -> None:
+    for path in _spill_files:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
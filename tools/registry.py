@@ -0,0 +1,45 @@
+from __future__ import annotations
+from typing import Any, Iterator
+from tools.base import Tool
+
+
+class ToolRegistry:
+    def __init__(self) -> None:
+        self._tools: dict[str, Tool] = {}
+        self._openai_tools: list[dict[str, Any]] | None = None
+
+    def register(self, tool: Tool) -> None:
+        if tool.name in self._tools:
+            raise ValueError(f"Tool '{tool.name}' is already registered")
+        # Build the schema up front so a bad one fails at registration, not mid-request
+        tool.to_openai_schema()
+        self._tools[tool.name] = tool
+        self._openai_tools = None
+
+    def unregister(self, name: str) -> None:
+        if self._tools.pop(name, None) is not None:
+            self._openai_tools = None
+
+    def get_openai_tools(self) -> list[dict[str, Any]]:
+        """The `tools` request payload, rebuilt only when the registered set changes."""
+        if self._openai_tools is None:
+            self._openai_tools = [
+                {"type": "function", "function": tool.to_openai_schema()}
+                for tool in self._tools.values()
+            ]
+        return self._openai_tools
+
+    def get(self, name: str) -> Tool | None:
+        return self._tools.get(name)
+
+    def list_tools(self) -> list[Tool]:
+        return list(self._tools.values())
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def __iter__(self) -> Iterator[Tool]:
+        return iter(self._tools.values())
+
+    def __len__(self) -> int:
+        return len(self._tools)
@@ -0,0 +1,104 @@
+from __future__ import annotations
+import json
+import sys
+import time
+from dataclasses import asdict
+from typing import Any, BinaryIO
+from agent import Agent, AgentEvent, AgentEventType
+from client import get_client_pool
+from client.stream import RunLimits
+from context import SessionStore
+from metrics import get_tracer
+
+OUTPUT_FORMATS = ("json", "jsonl")
+
+
+class HeadlessWriter:
+    """Writes Agent.run events as JSON for scripts and pipelines.
+
+    `json` writes one object with the final result once the run ends;
+    `jsonl` writes one line per event as it happens. Output goes to a
+    buffered binary stream and is flushed when the run ends, so nothing
+    here touches rich or formats anything per token.
+    """
+
+    def __init__(self, output: str, stream: BinaryIO | None = None) -> None:
+        if output not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format: {output}")
+
+        self.output = output
+        self._stream = stream or sys.stdout.buffer
+        self._start = time.perf_counter()
+        self._ttft: float | None = None
+        self._errors: list[str] = []
+        self._result: dict[str, Any] | None = None
+
+    @property
+    def needs_deltas(self) -> bool:
+        """Only the event stream shows deltas; the final result can use a non-streaming request."""
+        return self.output == "jsonl"
+
+    @property
+    def ok(self) -> bool:
+        return (
+            not self._errors
+            and self._result is not None
+            and self._result["content"] is not None
+        )
+
+    def handle(self, event: AgentEvent) -> None:
+        elapsed = time.perf_counter() - self._start
+        if event.type == AgentEventType.TEXT_DELTA and self._ttft is None:
+            self._ttft = elapsed
+        elif event.type == AgentEventType.AGENT_ERROR:
+            self._errors.append(event.error)
+        elif event.type == AgentEventType.AGENT_END:
+            self._result = {
+                "content": event.response,
+                "finish_reason": event.finish_reason,
+                "usage": asdict(event.usage) if event.usage else None,
+                "errors": self._errors,
+                "timings": {
+                    "total_seconds": round(elapsed, 6),
+                    "ttft_seconds": round(self._ttft, 6) if self._ttft is not None else None,
+                },
+            }
+
+        if self.output == "jsonl":
+            record = {"type": event.type.value, "elapsed": round(elapsed, 6), **event.data}
+            if event.type == AgentEventType.AGENT_END:
+                record["timings"] = self._result["timings"]
+            self._write(record)
+
+    def finish(self, session_id: str | None = None) -> None:
+        if self.output == "json":
+            result = self._result or {"content": None, "errors": self._errors}
+            self._write({**result, "session_id": session_id})
+        elif session_id:
+            self._write({"type": "session", "session_id": session_id})
+        self._stream.flush()
+
+    def _write(self, record: dict[str, Any]) -> None:
+        self._stream.write(json.dumps(record, ensure_ascii=False).encode("utf-8"))
+        self._stream.write(b"\n")
+
+
+async def run_headless(
+    message: str,
+    output: str,
+    resume: str | None = None,
+    limits: RunLimits | None = None,
+) -> bool:
+    """Run one turn without the TUI, writing JSON to stdout; True if it produced a reply."""
+    writer = HeadlessWriter(output)
+    store = SessionStore()
+    session = store.open(resume) if resume else store.create()
+    try:
+        async with Agent(session, limits) as agent:
+            async for event in agent.run(message, stream=writer.needs_deltas):
+                writer.handle(event)
+    finally:
+        await get_client_pool().aclose()
+        get_tracer().close()
+        writer.finish(session.id)
+    return writer.ok
@@ -1,7 +1,15 @@
+from __future__ import annotations
+import asyncio
+import time
+from typing import TYPE_CHECKING
 from rich.console import Console
 from rich.theme import Theme
 from rich.rule import Rule
 from rich.text import Text
+from config import config
+
+if TYPE_CHECKING:
+    from rich.live import Live
 
 AGENT_THEME = Theme(
     {
@@ -29,6 +37,9 @@ AGENT_THEME = Theme(
     }
 )
 
+# Longest open tail re-rendered per frame in live markdown mode
+LIVE_TAIL_MAX_CHARS = 4096
+
 _console: Console | None = None
 
 def get_console() -> Console:
@@ -39,19 +50,117 @@ def get_console() -> Console:
     return _console
 
 class TUI:
-    def __init__(self, console: Console | None = None) -> None:
+    def __init__(
+        self,
+        console: Console | None = None,
+        frame_rate: float | None = None,
+        markdown: bool | None = None,
+    ) -> None:
         self.console = console or get_console()
         self._assistant_stream_open = False
 
+        frame_rate = frame_rate if frame_rate is not None else config.UI_FRAME_RATE
+        self._frame_interval = 1 / frame_rate if frame_rate > 0 else 0.0
+        self._markdown = config.UI_MARKDOWN if markdown is None else markdown
+
+        # Deltas collected since the last flush
+        self._pending: list[str] = []
+        self._last_flush = 0.0
+        self._flush_handle: asyncio.TimerHandle | None = None
+
+        # Live markdown region and the not-yet-committed tail it renders
+        self._live: Live | None = None
+        self._live_text = ""
+
     def begin_assitant(self) -> None:
         self.console.print()
         self.console.print(Rule(Text("Assistant", style="assistant")))
         self._assistant_stream_open = True
+        self._last_flush = time.monotonic()
+
+        if self._markdown and self.console.is_terminal:
+            self._live_text = ""
+            self._live = self._start_live()
 
     def end_assistant(self) -> None:
         if self._assistant_stream_open:
-            self.console.print()
+            self.flush()
+            if self._live:
+                self._live.stop()
+                self._live = None
+            else:
+                self.console.print()
             self._assistant_stream_open = False
 
     def stream_assistant_delta(self, content: str) -> None:
-        self.console.print(content, end="", markup=False)
+        self._pending.append(content)
+
+        if (
+            ("\n" in content and self._live is None)
+            or not self._frame_interval
+            or time.monotonic() - self._last_flush >= self._frame_interval
+        ):
+            self.flush()
+        elif self._flush_handle is None:
+            self._schedule_flush()
+
+    def flush(self) -> None:
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        if self._pending:
+            text = "".join(self._pending)
+            self._pending.clear()
+
+            if self._live:
+                self._render_live(text)
+            elif self.console.is_terminal:
+                self.console.out(text, end="", highlight=False)
+            else:
+                # Piped or redirected output: no styling to apply, skip rich entirely
+                self.console.file.write(text)
+                self.console.file.flush()
+
+        self._last_flush = time.monotonic()
+
+    def _schedule_flush(self) -> None:
+        # Bound how long buffered text can sit on screen when the stream stalls
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._flush_handle = loop.call_later(self._frame_interval, self.flush)
+
+    def _render_live(self, text: str) -> None:
+        from rich.markdown import Markdown
+
+        self._live_text += text
+
+        # Commit finished blocks above the live region so each frame only
+        # re-renders the open tail instead of the whole response.
+        split = self._live_text.rfind("\n\n")
+        if split == -1 and len(self._live_text) > LIVE_TAIL_MAX_CHARS:
+            split = self._live_text.rfind("\n")
+
+        if split > 0 and self._live_text.count("```", 0, split) % 2 == 0:
+            self._live.update(Markdown(self._live_text[:split]), refresh=True)
+            self._live.stop()
+            self._live_text = self._live_text[split:].lstrip("\n")
+            self._live = self._start_live()
+
+        self._live.update(Markdown(self._live_text), refresh=True)
+
+    def _start_live(self) -> Live:
+        # rich.markdown pulls in markdown-it and pygments; only load it when markdown rendering is on
+        from rich.live import Live
+        from rich.markdown import Markdown
+
+        live = Live(
+            Markdown(""),
+            console=self.console,
+            auto_refresh=False,
+            vertical_overflow="visible",
+        )
+        live.start()
+        return live
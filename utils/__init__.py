@@ -1 +1,7 @@
-from .text import count_tokens
+from .text import (
+    count_tokens,
+    count_tokens_async,
+    count_tokens_batch,
+    count_tokens_batch_async,
+    get_encoding,
+)
@@ -1,21 +1,142 @@
-import tiktoken
+from __future__ import annotations
+import asyncio
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TYPE_CHECKING
+from config import config
 
-def get_tokenizer(model: str):
-    try: 
-        encoding = tiktoken.encoding_for_model(model)
-        return encoding.encode
-    except Exception:
-        encoding = tiktoken.get_encoding("cl100k_base")
-        return encoding.encode
+if TYPE_CHECKING:
+    import tiktoken
+
+FALLBACK_ENCODING = "cl100k_base"
+
+# Texts shorter than this are cheaper to encode inline than to hand off to a thread
+ASYNC_OFFLOAD_THRESHOLD = 4096
+BATCH_NUM_THREADS = 4
+
+_encodings: dict[str | None, tiktoken.Encoding | None] = {}
+_encodings_lock = threading.Lock()
+_warned_estimate = False
+_executor: ThreadPoolExecutor | None = None
+
+
+def get_encoding(model: str | None) -> tiktoken.Encoding | None:
+    """Resolve the encoding for a model once and reuse it for every later call."""
+    try:
+        return _encodings[model]
+    except KeyError:
+        pass
+
+    with _encodings_lock:
+        if model not in _encodings:
+            _encodings[model] = _resolve_encoding(model)
+        return _encodings[model]
+
+
+def _resolve_encoding(model: str | None) -> tiktoken.Encoding | None:
+    import tiktoken
+    from utils import tokenizer_cache
+
+    tokenizer_cache.configure()
+
+    names: list[str] = []
+    if model:
+        try:
+            names.append(tiktoken.encoding_name_for_model(model))
+        except Exception:
+            pass
+    names.append(FALLBACK_ENCODING)
+
+    for name in names:
+        # Offline, only load encodings whose BPE file is already on disk;
+        # anything else falls back to estimate_tokens instead of downloading
+        if not tokenizer_cache.ensure_cached(name) and config.TOKENIZER_OFFLINE:
+            continue
+        try:
+            return tiktoken.get_encoding(name)
+        except Exception:
+            pass
+
+    _warn_estimated(model)
+    return None
+
+
+def _warn_estimated(model: str | None) -> None:
+    global _warned_estimate
+    if _warned_estimate:
+        return
+    _warned_estimate = True
+    warnings.warn(
+        f"No tokenizer available for model '{model}'; token counts are estimated and may "
+        "undercount. Run `python -m utils.tokenizer_cache` to install the BPE files.",
+        RuntimeWarning,
+        stacklevel=3,
+    )
+
+
+def get_tokenizer(model: str | None) -> Callable[[str], list[int]] | None:
+    encoding = get_encoding(model)
+    if encoding is None:
+        return None
+
+    return encoding.encode_ordinary
+
+
+def count_tokens(text: str | None, model: str | None) -> int:
+    if not text:
+        return 0
 
-def count_tokens(text: str, model: str) -> int:
     tokenizer = get_tokenizer(model)
 
     if tokenizer:
         return len(tokenizer(text))
-        
+
     return estimate_tokens(text)
-    
+
+
+def count_tokens_batch(
+    texts: list[str | None],
+    model: str | None,
+    num_threads: int = BATCH_NUM_THREADS,
+) -> list[int]:
+    encoding = get_encoding(model)
+
+    if encoding is None:
+        return [estimate_tokens(text) if text else 0 for text in texts]
+
+    non_empty = [text for text in texts if text]
+    encoded = iter(encoding.encode_ordinary_batch(non_empty, num_threads=num_threads))
+
+    return [len(next(encoded)) if text else 0 for text in texts]
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=BATCH_NUM_THREADS,
+            thread_name_prefix="tokenizer",
+        )
+
+    return _executor
+
+
+async def count_tokens_async(text: str | None, model: str | None) -> int:
+    if not text or len(text) < ASYNC_OFFLOAD_THRESHOLD:
+        return count_tokens(text, model)
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), count_tokens, text, model)
+
+
+async def count_tokens_batch_async(
+    texts: list[str | None],
+    model: str | None,
+) -> list[int]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), count_tokens_batch, texts, model)
+
 
 def estimate_tokens(text: str) -> int:
-    return max(1, len(text) // 4)
\ No newline at end of file
+    return max(1, len(text) // 4)
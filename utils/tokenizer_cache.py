@@ -0,0 +1,131 @@
+"""Local tiktoken cache, so token counting never has to download BPE files.
+
+BPE files tiktoken already cached in its own default location are copied
+over on first use. Otherwise warm the cache once (e.g. at install time) on a
+machine with network access, or seed it from a copied .tiktoken file on one
+without; until then counts are estimated:
+
+    python -m utils.tokenizer_cache                    # default encodings
+    python -m utils.tokenizer_cache cl100k_base o200k_base
+    python -m utils.tokenizer_cache --from-file cl100k_base.tiktoken --encoding cl100k_base
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from config import config
+
+BLOB_URL = "https://openaipublic.blob.core.windows.net/encodings/{}.tiktoken"
+
+# Encoding name -> the BPE file tiktoken downloads for it
+ENCODING_FILES = {
+    "r50k_base": "r50k_base",
+    "p50k_base": "p50k_base",
+    "p50k_edit": "p50k_base",
+    "cl100k_base": "cl100k_base",
+    "o200k_base": "o200k_base",
+    "o200k_harmony": "o200k_base",
+}
+
+DEFAULT_ENCODINGS = ("cl100k_base", "o200k_base")
+
+
+def get_cache_dir() -> Path:
+    return Path(os.environ.get("TIKTOKEN_CACHE_DIR") or config.TOKENIZER_CACHE_DIR).expanduser()
+
+
+def configure() -> None:
+    """Point tiktoken's own file cache at our persistent directory (it defaults to /tmp)."""
+    os.environ.setdefault("TIKTOKEN_CACHE_DIR", str(get_cache_dir()))
+
+
+def cached_path(encoding_name: str) -> Path | None:
+    """Where tiktoken looks for the encoding's BPE file, or None for encodings we can't map."""
+    file_name = ENCODING_FILES.get(encoding_name)
+    if file_name is None:
+        return None
+    cache_key = hashlib.sha1(BLOB_URL.format(file_name).encode()).hexdigest()
+    return get_cache_dir() / cache_key
+
+
+def is_cached(encoding_name: str) -> bool:
+    path = cached_path(encoding_name)
+    return path is not None and path.exists()
+
+
+def tiktoken_cache_dirs() -> list[Path]:
+    """Where tiktoken caches BPE files when TIKTOKEN_CACHE_DIR isn't ours."""
+    dirs = [Path(tempfile.gettempdir()) / "data-gym-cache"]
+    if os.environ.get("DATA_GYM_CACHE_DIR"):
+        dirs.insert(0, Path(os.environ["DATA_GYM_CACHE_DIR"]).expanduser())
+    return dirs
+
+
+def ensure_cached(encoding_name: str) -> bool:
+    """Whether the encoding's BPE file is in our cache, copying in tiktoken's own copy if it has one."""
+    path = cached_path(encoding_name)
+    if path is None:
+        return False
+    if path.exists():
+        return True
+
+    for directory in tiktoken_cache_dirs():
+        source = directory / path.name
+        if source.is_file():
+            try:
+                seed(encoding_name, source)
+            except OSError:
+                return False
+            return True
+    return False
+
+
+def warm(encoding_names: list[str]) -> None:
+    """Load each encoding once with downloads allowed, filling the cache."""
+    import tiktoken
+
+    configure()
+    for name in encoding_names:
+        tiktoken.get_encoding(name)
+
+
+def seed(encoding_name: str, source: str | Path) -> Path:
+    """Install a local .tiktoken file as the cached copy of an encoding."""
+    path = cached_path(encoding_name)
+    if path is None:
+        raise ValueError(f"Unknown encoding '{encoding_name}'")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(source, path)
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fill the local tokenizer cache.")
+    parser.add_argument("encodings", nargs="*", default=list(DEFAULT_ENCODINGS))
+    parser.add_argument("--from-file", type=Path, help="Local .tiktoken file to install.")
+    parser.add_argument("--encoding", help="Encoding the --from-file file belongs to.")
+    args = parser.parse_args()
+
+    if args.from_file:
+        if not args.encoding:
+            parser.error("--from-file needs --encoding")
+        print(f"{args.encoding}: {seed(args.encoding, args.from_file)}")
+        return
+
+    try:
+        warm(args.encodings)
+    except Exception as e:
+        print(f"Failed to warm tokenizer cache: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    for name in args.encodings:
+        print(f"{name}: {cached_path(name) or 'cached by tiktoken'}")
+
+
+if __name__ == "__main__":
+    main()